@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Đo hiệu năng đường phiên âm của GK1 trên dữ liệu thực
+(6.844 âm tiết groundtruth và văn bản dựng từ các mục từ VDic_uni.txt),
+cùng chi phí khởi động: thời gian import main và khởi tạo bộ phiên âm
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import (ToneHandler, SyllableAnalyzer, VietnamesePhonemeTranscriber,
+                  load_syllables)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, '..', 'GK2', 'data')
+VDIC_FILE = os.path.join(DATA_DIR, 'VDic_uni.txt')
+BASELINE_FILE = os.path.join(BASE_DIR, 'benchmark_baseline.json')
+
+# Mức tăng bộ nhớ đỉnh tuyệt đối bỏ qua (KiB): các trường hợp chỉ cấp phát vài KiB
+# dao động lớn theo tỉ lệ dù không có hồi quy thật
+MEMORY_SLACK_KIB = 16
+
+
+def load_headword_text(path: str = VDIC_FILE) -> str:
+    """Dựng văn bản từ các mục từ (cột đầu) của VDic_uni.txt"""
+    words = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            if '\t' in line:
+                words.append(line.split('\t', 1)[0])
+    return '\n'.join(words)
+
+
+def measure(func: Callable[[], int], repeat: int) -> Dict[str, float]:
+    """
+    Chạy func nhiều lần, lấy thời gian tốt nhất và bộ nhớ đỉnh
+
+    Args:
+        func: Hàm đo, trả về số âm tiết đã xử lý
+        repeat: Số lần lặp
+
+    Returns:
+        Dictionary gồm seconds, syllables, syllables_per_sec, peak_kib
+    """
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func()
+        best = min(best, time.perf_counter() - start)
+
+    # Đo bộ nhớ đỉnh ở một lần chạy riêng để tracemalloc không làm sai thời gian
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'seconds': best,
+        'syllables': count,
+        'syllables_per_sec': count / best if best else 0.0,
+        'peak_kib': peak / 1024
+    }
+
+
+# Đo import main trong tiến trình mới (không có sẵn module trong sys.modules)
+IMPORT_SCRIPT = """
+import json, sys, time, tracemalloc
+sys.path.insert(0, {base!r})
+if {trace!r}:
+    tracemalloc.start()
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'peak': tracemalloc.get_traced_memory()[1]}}))
+"""
+
+
+def _run_import(trace: bool) -> Dict[str, float]:
+    script = IMPORT_SCRIPT.format(base=BASE_DIR, trace=trace)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output)
+
+
+def measure_import(repeat: int) -> Dict[str, float]:
+    """
+    Đo thời gian import main ở tiến trình con, lấy lần nhanh nhất
+    
+    Returns:
+        Dictionary cùng dạng với measure (mỗi lần import tính là 1 đơn vị)
+    """
+    best = min(_run_import(False)['seconds'] for _ in range(repeat))
+    # Bộ nhớ đỉnh đo ở lần chạy riêng như measure
+    peak = _run_import(True)['peak']
+    return {
+        'seconds': best,
+        'syllables': 1,
+        'syllables_per_sec': 1 / best if best else 0.0,
+        'peak_kib': peak / 1024
+    }
+
+
+def build_cases(syllables: List[str], text: str) -> Dict[str, Callable[[], int]]:
+    """Các trường hợp đo: mỗi hàm trả về số âm tiết đã xử lý"""
+    tone_handler = ToneHandler()
+    analyzer = SyllableAnalyzer()
+    uncached = VietnamesePhonemeTranscriber(cache_size=0)
+    text_syllables = len(uncached.split_text_to_syllables(text))
+
+    def get_tone():
+        for s in syllables:
+            tone_handler.get_tone(s)
+        return len(syllables)
+
+    def remove_tone_marks():
+        for s in syllables:
+            tone_handler.remove_tone_marks(s)
+        return len(syllables)
+
+    def split_syllable():
+        for s in syllables:
+            analyzer.split_syllable(s)
+        return len(syllables)
+
+    def transcribe_syllable():
+        for s in syllables:
+            uncached.transcribe_syllable(s)
+        return len(syllables)
+
+    def transcribe_syllable_cached():
+        cached = VietnamesePhonemeTranscriber()
+        for _ in range(2):
+            for s in syllables:
+                cached.transcribe_syllable(s)
+        return 2 * len(syllables)
+
+    def transcribe_text():
+        VietnamesePhonemeTranscriber().transcribe_text(text)
+        return text_syllables
+    
+    def construct_transcriber():
+        for _ in range(1000):
+            VietnamesePhonemeTranscriber()
+        return 1000
+    
+    def construct_transcriber_table():
+        # Bảng phiên âm được biên dịch một lần rồi dùng chung giữa các instance
+        for _ in range(1000):
+            VietnamesePhonemeTranscriber(use_table=True)
+        return 1000
+
+    return {
+        'get_tone': get_tone,
+        'remove_tone_marks': remove_tone_marks,
+        'split_syllable': split_syllable,
+        'transcribe_syllable': transcribe_syllable,
+        'transcribe_syllable_cached': transcribe_syllable_cached,
+        'transcribe_text': transcribe_text,
+        'construct_transcriber': construct_transcriber,
+        'construct_transcriber_table': construct_transcriber_table
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float, memory_tolerance: float) -> Tuple[List[str], List[str]]:
+    """
+    So sánh với baseline, trả về các trường hợp bị chậm đi và tốn bộ nhớ hơn quá ngưỡng
+
+    Args:
+        results: Kết quả đo hiện tại
+        baseline: Kết quả đo đã lưu
+        tolerance: Tỉ lệ chậm đi cho phép (0.2 = 20%)
+        memory_tolerance: Tỉ lệ tăng bộ nhớ đỉnh cho phép (ngoài MEMORY_SLACK_KIB)
+
+    Returns:
+        Tuple (trường hợp chậm đi, trường hợp tăng bộ nhớ đỉnh)
+    """
+    slower, larger = [], []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base.get('syllables_per_sec'):
+            ratio = result['syllables_per_sec'] / base['syllables_per_sec']
+            if ratio < 1 - tolerance:
+                slower.append(name)
+        if 'peak_kib' in base:
+            limit = base['peak_kib'] * (1 + memory_tolerance) + MEMORY_SLACK_KIB
+            if result['peak_kib'] > limit:
+                larger.append(name)
+    return slower, larger
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo hiệu năng phiên âm GK1")
+    parser.add_argument('--repeat', type=int, default=5, help="Số lần lặp mỗi trường hợp")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="File baseline JSON")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Ghi kết quả hiện tại làm baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Tỉ lệ chậm đi cho phép trước khi báo hồi quy")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25,
+                        help="Tỉ lệ tăng bộ nhớ đỉnh cho phép trước khi báo hồi quy")
+    args = parser.parse_args(argv)
+
+    syllables = load_syllables()
+    text = load_headword_text()
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    cases = build_cases(syllables, text)
+    cases['import_main'] = None
+    
+    results = {}
+    # Với các trường hợp khởi động, cột tốc độ là số lần khởi tạo/import mỗi giây
+    print(f"{'case':28s} {'items/s':>12s} {'peak KiB':>10s} {'vs baseline':>12s} "
+          f"{'peak vs base':>12s}")
+    for name, func in cases.items():
+        result = measure_import(args.repeat) if func is None else measure(func, args.repeat)
+        results[name] = result
+        base = baseline.get(name)
+        delta = peak_delta = ''
+        if base and base.get('syllables_per_sec'):
+            delta = f"{result['syllables_per_sec'] / base['syllables_per_sec']:.2f}x"
+        if base and base.get('peak_kib'):
+            peak_delta = f"{result['peak_kib'] / base['peak_kib']:.2f}x"
+        print(f"{name:28s} {result['syllables_per_sec']:12,.0f} "
+              f"{result['peak_kib']:10,.0f} {delta:>12s} {peak_delta:>12s}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("No baseline found; run with --save-baseline to create one")
+        return 0
+
+    slower, larger = compare(results, baseline, args.tolerance, args.memory_tolerance)
+    if slower:
+        print(f"Regressions (> {args.tolerance:.0%} slower): {', '.join(slower)}")
+    if larger:
+        print(f"Regressions (> {args.memory_tolerance:.0%} more peak memory): "
+              f"{', '.join(larger)}")
+    if slower or larger:
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
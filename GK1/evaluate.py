@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Đánh giá bộ phiên âm trên toàn bộ danh sách âm tiết groundtruth
+Chạy song song theo khối, gom các bất thường theo thành phần và xuất báo cáo JSON
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import (GROUNDTRUTH_FILE, PhonemeMapper, VietnamesePhonemeTranscriber, load_syllables,
+                  non_negative_int, positive_int, read_chunks)
+
+# Chữ cái nguyên âm sau khi bỏ dấu thanh
+_VOWEL_LETTERS = frozenset('aăâeêioôơuưy')
+
+COMPONENTS = ('initial', 'medial', 'nucleus', 'final')
+
+_worker_transcriber = None
+
+
+def classify(result: Dict, mapper: PhonemeMapper, clean: str) -> List[Tuple[str, str]]:
+    """
+    Phát hiện bất thường trong kết quả phiên âm một âm tiết
+
+    Args:
+        result: Kết quả của transcribe_syllable
+        mapper: Bảng ánh xạ âm vị để nhận ra các nhánh fallback
+        clean: Âm tiết chữ thường đã bỏ dấu
+
+    Returns:
+        Danh sách (thành phần, loại bất thường)
+    """
+    components = result['components']
+    initial, medial = components['initial'], components['medial']
+    nucleus, final = components['nucleus'], components['final']
+    anomalies = []
+
+    if initial not in mapper.initial_consonants and initial != 'qu':
+        anomalies.append(('initial', 'fallback'))
+    elif not initial and clean and clean[0] not in _VOWEL_LETTERS:
+        # Âm tiết bắt đầu bằng phụ âm nhưng không nhận ra âm đầu (vd. p)
+        anomalies.append(('initial', 'misparse'))
+
+    if medial not in ('', 'u', 'o'):
+        anomalies.append(('medial', 'fallback'))
+
+    if not nucleus:
+        anomalies.append(('nucleus', 'empty'))
+    elif nucleus not in mapper.vowels:
+        anomalies.append(('nucleus', 'fallback'))
+
+    if final not in mapper.final_consonants:
+        anomalies.append(('final', 'fallback'))
+    elif nucleus and nucleus[-1] not in _VOWEL_LETTERS:
+        # Phụ âm còn sót trong âm chính: _extract_final không tách được âm cuối
+        anomalies.append(('final', 'misparse'))
+
+    # Các thành phần ghép lại phải trả về đúng chuỗi đầu vào
+    rebuilt = initial + ('' if initial == 'qu' else medial) + nucleus + final
+    if rebuilt != clean:
+        anomalies.append(('nucleus', 'truncated'))
+    return anomalies
+
+
+def _init_worker() -> None:
+    global _worker_transcriber
+    _worker_transcriber = VietnamesePhonemeTranscriber(cache_size=0, instrument=True)
+
+
+def _evaluate_chunk(start: int, syllables: List[str]) -> Tuple[List[Dict], Dict[str, int]]:
+    """Phiên âm một khối, trả về các bất thường và bộ đếm fallback của khối"""
+    if _worker_transcriber is None:
+        _init_worker()
+    transcriber = _worker_transcriber
+    transcriber.reset_stage_stats()
+    mapper = transcriber.phoneme_mapper
+    split_tone = transcriber.syllable_analyzer.tone_handler.split_tone
+
+    records = []
+    for index, syllable in enumerate(syllables, start):
+        result = transcriber.transcribe_syllable(syllable)
+        anomalies = classify(result, mapper, split_tone(result['original'])[1])
+        if anomalies:
+            records.append({
+                'index': index,
+                'syllable': syllable,
+                'anomalies': anomalies,
+                'components': {c: result['components'][c] for c in COMPONENTS},
+                'transcription': result['full_transcription']
+            })
+    return records, transcriber.stage_stats()['fallbacks']
+
+
+def evaluate(syllables: List[str], workers: int = 0, chunk_size: int = 500) -> Dict:
+    """
+    Đánh giá bộ phiên âm trên danh sách âm tiết
+
+    Args:
+        syllables: Danh sách âm tiết
+        workers: Số tiến trình con (0 = chạy trong tiến trình hiện tại)
+        chunk_size: Số âm tiết mỗi khối gửi cho tiến trình con
+
+    Returns:
+        Báo cáo gồm tổng số, số lượng và danh sách bất thường theo thành phần,
+        bộ đếm fallback của các hàm _map_* và thời gian chạy
+    """
+    start = time.perf_counter()
+    chunks = list(read_chunks(syllables, chunk_size))
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(_evaluate_chunk, *zip(*chunks))) if chunks else []
+    else:
+        results = [_evaluate_chunk(first, chunk) for first, chunk in chunks]
+
+    anomalies = {component: defaultdict(list) for component in COMPONENTS}
+    fallbacks = defaultdict(int)
+    flagged = 0
+    for records, chunk_fallbacks in results:
+        flagged += len(records)
+        for record in records:
+            for component, kind in record['anomalies']:
+                anomalies[component][kind].append(record)
+        for branch, count in chunk_fallbacks.items():
+            fallbacks[branch] += count
+
+    return {
+        'total': len(syllables),
+        'flagged': flagged,
+        'seconds': time.perf_counter() - start,
+        'workers': workers,
+        'fallbacks': {branch: fallbacks[branch] for branch in sorted(fallbacks)},
+        'counts': {component: {kind: len(records) for kind, records in sorted(kinds.items())}
+                   for component, kinds in anomalies.items()},
+        'anomalies': {component: {kind: [{k: v for k, v in r.items() if k != 'anomalies'}
+                                         for r in records]
+                                  for kind, records in sorted(kinds.items())}
+                      for component, kinds in anomalies.items()}
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Đánh giá bộ phiên âm trên danh sách groundtruth")
+    parser.add_argument('-i', '--input', default=GROUNDTRUTH_FILE, help="Danh sách âm tiết")
+    parser.add_argument('-o', '--output', default='-', help="File báo cáo JSON ('-' = stdout)")
+    parser.add_argument('-w', '--workers', type=non_negative_int, default=os.cpu_count() or 1,
+                        help="Số tiến trình con (0 = chạy tuần tự)")
+    parser.add_argument('--chunk-size', type=positive_int, default=500)
+    args = parser.parse_args(argv)
+
+    report = evaluate(load_syllables(args.input), args.workers, args.chunk_size)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    summary = ', '.join(f"{component}.{kind}={count}"
+                        for component, kinds in report['counts'].items()
+                        for kind, count in kinds.items())
+    print(f"{report['total']} syllables, {report['flagged']} flagged in "
+          f"{report['seconds']:.2f}s ({summary or 'no anomalies'})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Từ điển âm tiết dạng DAWG (automat hữu hạn không chu trình tối tiểu)
+Tra chính xác, liệt kê theo tiền tố và tra không phân biệt thanh điệu
+"""
+
+import argparse
+import os
+import struct
+import sys
+import unicodedata
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import (TONE_COMBINING_MARKS, TONE_MARKS, GROUNDTRUTH_FILE, RIMES_FILE,
+                  enumerate_syllables, load_rimes)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GK2')
+# Các danh sách âm tiết của GK2 dùng để dựng từ điển
+SYLLABLE_LISTS = [
+    GROUNDTRUTH_FILE,
+    os.path.join(DATA_DIR, 'output', 'output_syllables.txt')
+]
+
+# Định dạng file: magic, số từ, số nút, số cạnh, độ dài nhãn (byte UTF-8)
+MAGIC = b'VLEXDAWG'
+HEADER = struct.Struct('<8sIIII')
+
+# Ký tự mang thanh -> ký tự không thanh (chỉ bỏ dấu thanh, giữ ă â ê ô ơ ư)
+_TONE_STRIP = {
+    ch: unicodedata.normalize('NFC', unicodedata.normalize('NFD', ch)
+                              .replace(TONE_COMBINING_MARKS[code], '', 1))
+    for ch, code in TONE_MARKS.items() if code
+}
+_TONE_STRIP_TABLE = str.maketrans(_TONE_STRIP)
+
+# Ký tự không thanh -> các biến thể mang thanh của nó
+_TONE_VARIANTS: Dict[str, str] = {}
+for _toned, _base in _TONE_STRIP.items():
+    _TONE_VARIANTS[_base] = _TONE_VARIANTS.get(_base, _base) + _toned
+
+
+def strip_tone(text: str) -> str:
+    """Bỏ dấu thanh điệu (không bỏ dấu mũ, dấu trăng, dấu móc)"""
+    return text.translate(_TONE_STRIP_TABLE)
+
+
+class _BuildNode:
+    __slots__ = ('final', 'edges', 'id')
+
+    def __init__(self):
+        self.final = False
+        self.edges = {}
+        self.id = -1
+
+    def signature(self) -> Tuple:
+        return (self.final, tuple((ch, child.id) for ch, child in sorted(self.edges.items())))
+
+
+class Lexicon:
+    """
+    DAWG chỉ đọc lưu trong các mảng phẳng:
+    nút i có các cạnh [first[i], first[i + 1]) với nhãn labels[j] và đích targets[j]
+    """
+
+    def __init__(self, final: bytes, first: array, labels: str, targets: array, size: int):
+        self._final = final
+        self._first = first
+        self._labels = labels
+        self._targets = targets
+        self._size = size
+
+    @classmethod
+    def build(cls, words: Iterable[str]) -> 'Lexicon':
+        """
+        Dựng DAWG tối tiểu trực tiếp từ danh sách đã sắp xếp (thuật toán Daciuk),
+        không cần dựng trie đầy đủ trước
+
+        Args:
+            words: Các âm tiết (NFC); được sắp xếp và loại trùng trước khi dựng
+        """
+        register = {}
+        root = _BuildNode()
+        # Đường đi của từ trước đó: [(nút cha, ký tự, nút con)]
+        path: List[Tuple[_BuildNode, str, _BuildNode]] = []
+        previous = ''
+        size = 0
+
+        def minimize(down_to: int) -> None:
+            while len(path) > down_to:
+                parent, ch, child = path.pop()
+                key = child.signature()
+                existing = register.get(key)
+                if existing is not None:
+                    parent.edges[ch] = existing
+                else:
+                    child.id = len(register)
+                    register[key] = child
+
+        for word in sorted(set(words)):
+            common = 0
+            limit = min(len(word), len(previous))
+            while common < limit and word[common] == previous[common]:
+                common += 1
+            minimize(common)
+            node = path[-1][2] if path else root
+            for ch in word[common:]:
+                child = _BuildNode()
+                node.edges[ch] = child
+                path.append((node, ch, child))
+                node = child
+            node.final = True
+            previous = word
+            size += 1
+        minimize(0)
+        return cls._freeze(root, size)
+
+    @classmethod
+    def _freeze(cls, root: _BuildNode, size: int) -> 'Lexicon':
+        # Đánh số lại theo BFS để gốc là nút 0
+        order = [root]
+        index = {id(root): 0}
+        i = 0
+        while i < len(order):
+            for _, child in sorted(order[i].edges.items()):
+                if id(child) not in index:
+                    index[id(child)] = len(order)
+                    order.append(child)
+            i += 1
+
+        final = bytes(node.final for node in order)
+        first = array('I', [0])
+        labels = []
+        targets = array('I')
+        for node in order:
+            for ch, child in sorted(node.edges.items()):
+                labels.append(ch)
+                targets.append(index[id(child)])
+            first.append(len(targets))
+        return cls(final, first, ''.join(labels), targets, size)
+
+    def _step(self, node: int, ch: str) -> int:
+        j = self._labels.find(ch, self._first[node], self._first[node + 1])
+        return self._targets[j] if j >= 0 else -1
+
+    def _walk(self, prefix: str) -> int:
+        node = 0
+        for ch in prefix:
+            node = self._step(node, ch)
+            if node < 0:
+                break
+        return node
+
+    def __contains__(self, word: str) -> bool:
+        node = self._walk(word)
+        return node >= 0 and bool(self._final[node])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[str]:
+        return self.complete('')
+
+    @property
+    def node_count(self) -> int:
+        return len(self._final)
+
+    def _enumerate(self, node: int, prefix: str) -> Iterator[str]:
+        # Duyệt sâu bằng ngăn xếp, cạnh đã sắp xếp nên kết quả theo thứ tự từ điển
+        stack = [(node, prefix)]
+        while stack:
+            node, prefix = stack.pop()
+            if self._final[node]:
+                yield prefix
+            start, end = self._first[node], self._first[node + 1]
+            for j in range(end - 1, start - 1, -1):
+                stack.append((self._targets[j], prefix + self._labels[j]))
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> Iterator[str]:
+        """
+        Liệt kê các âm tiết bắt đầu bằng prefix theo thứ tự từ điển
+
+        Args:
+            prefix: Tiền tố (đã chuẩn hóa NFC)
+            limit: Số kết quả tối đa (None = không giới hạn)
+        """
+        node = self._walk(prefix)
+        if node < 0:
+            return
+        for count, word in enumerate(self._enumerate(node, prefix)):
+            if limit is not None and count >= limit:
+                return
+            yield word
+
+    def lookup_toneless(self, word: str) -> List[str]:
+        """
+        Mọi âm tiết trong từ điển có dạng bỏ dấu thanh trùng với word
+
+        Duyệt song song các biến thể mang thanh của từng ký tự; mỗi ký tự có
+        tối đa 6 biến thể nên thời gian tỉ lệ với độ dài từ khóa.
+        """
+        states = [(0, '')]
+        for ch in strip_tone(word):
+            variants = _TONE_VARIANTS.get(ch, ch)
+            next_states = []
+            for node, prefix in states:
+                for variant in variants:
+                    child = self._step(node, variant)
+                    if child >= 0:
+                        next_states.append((child, prefix + variant))
+            states = next_states
+            if not states:
+                return []
+        return sorted(prefix for node, prefix in states if self._final[node])
+
+    def save(self, path: str) -> None:
+        """Ghi ra file nhị phân gọn (little-endian)"""
+        labels = self._labels.encode('utf-8')
+        first, targets = array('I', self._first), array('I', self._targets)
+        if sys.byteorder != 'little':
+            first.byteswap()
+            targets.byteswap()
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self._size, len(self._final), len(targets), len(labels)))
+            f.write(self._final)
+            f.write(first.tobytes())
+            f.write(targets.tobytes())
+            f.write(labels)
+
+    @classmethod
+    def load(cls, path: str) -> 'Lexicon':
+        with open(path, 'rb') as f:
+            magic, size, nodes, edges, label_bytes = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"not a lexicon file: {path}")
+            final = f.read(nodes)
+            first = array('I')
+            first.frombytes(f.read(4 * (nodes + 1)))
+            targets = array('I')
+            targets.frombytes(f.read(4 * edges))
+            labels = f.read(label_bytes).decode('utf-8')
+        if sys.byteorder != 'little':
+            first.byteswap()
+            targets.byteswap()
+        if len(final) != nodes or len(labels) != edges:
+            raise ValueError(f"truncated lexicon file: {path}")
+        return cls(final, first, labels, targets, size)
+
+
+def load_syllable_list(path: str) -> List[str]:
+    """Đọc danh sách âm tiết (mỗi dòng một âm tiết), chuẩn hóa NFC chữ thường"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [unicodedata.normalize('NFC', line.strip().lower()) for line in f if line.strip()]
+
+
+def build_lexicon(lists: Iterable[str] = SYLLABLE_LISTS, rimes_path: Optional[str] = RIMES_FILE) -> Lexicon:
+    """
+    Dựng từ điển từ các danh sách âm tiết GK2 và tổ hợp âm đầu × vần × 6 thanh
+
+    Args:
+        lists: Các file danh sách âm tiết (bỏ qua file không tồn tại)
+        rimes_path: File vần để sinh thêm âm tiết; None để chỉ dùng danh sách
+    """
+    words = set()
+    for path in lists:
+        if os.path.exists(path):
+            words.update(load_syllable_list(path))
+    if rimes_path:
+        words.update(enumerate_syllables(load_rimes(rimes_path)))
+    return Lexicon.build(words)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Từ điển âm tiết DAWG")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_build = sub.add_parser('build', help="Dựng và ghi từ điển")
+    p_build.add_argument('output')
+    p_build.add_argument('--attested-only', action='store_true',
+                         help="Chỉ dùng các danh sách âm tiết, không sinh từ rimes.txt")
+    p_query = sub.add_parser('query', help="Tra từ điển")
+    p_query.add_argument('lexicon')
+    p_query.add_argument('words', nargs='+')
+    p_query.add_argument('-m', '--mode', choices=('exact', 'prefix', 'toneless'), default='exact')
+    p_query.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        lexicon = build_lexicon(rimes_path=None if args.attested_only else RIMES_FILE)
+        lexicon.save(args.output)
+        print(f"{len(lexicon)} syllables, {lexicon.node_count} nodes -> {args.output} "
+              f"({os.path.getsize(args.output):,} bytes)")
+        return
+
+    lexicon = Lexicon.load(args.lexicon)
+    for word in args.words:
+        word = unicodedata.normalize('NFC', word.lower())
+        if args.mode == 'exact':
+            print(f"{word}\t{'yes' if word in lexicon else 'no'}")
+        elif args.mode == 'prefix':
+            print(f"{word}\t{' '.join(lexicon.complete(word, args.limit))}")
+        else:
+            print(f"{word}\t{' '.join(lexicon.lookup_toneless(word))}")
+
+
+if __name__ == "__main__":
+    main()
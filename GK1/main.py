@@ -5,41 +5,119 @@ Chương trình phiên âm âm vị học tiếng Việt
 Chuyển đổi văn bản tiếng Việt thành ký hiệu âm vị (gần-IPA) kèm thanh điệu
 """
 
+import json
+import os
 import re
+import sys
+import time
 import unicodedata
-from typing import List, Tuple, Dict, Optional
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict, deque
+from itertools import islice
+from types import MappingProxyType
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Dict, Optional
+
+# numpy là phụ thuộc tùy chọn, chỉ cần cho FeatureEncoder: nhập khi dùng lần đầu
+# để các tiến trình CLI/worker ngắn không phải trả ~100 ms thời gian import
+np = None
+
+
+def _import_numpy():
+    """Nhập numpy khi cần, trả về None nếu chưa cài"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
+
+
+# Danh sách vần chuẩn dùng chung với GK2
+RIMES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'GK2', 'data', 'rimes.txt')
+# Danh sách âm tiết groundtruth của GK2 (đánh giá, benchmark, chỉ mục âm vị)
+GROUNDTRUTH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'GK2', 'data', 'groundtruth_syllables.txt')
+
+
+# Bảng ánh xạ từ ký tự có dấu sang thanh điệu (chỉ đọc, dùng chung mọi ToneHandler)
+TONE_MARKS = MappingProxyType({
+    # Thanh ngang (0) - không dấu
+    'a': 0, 'ă': 0, 'â': 0, 'e': 0, 'ê': 0, 'i': 0, 'o': 0, 'ô': 0, 'ơ': 0, 'u': 0, 'ư': 0, 'y': 0,
+    
+    # Thanh huyền (1)
+    'à': 1, 'ằ': 1, 'ầ': 1, 'è': 1, 'ề': 1, 'ì': 1, 'ò': 1, 'ồ': 1, 'ờ': 1, 'ù': 1, 'ừ': 1, 'ỳ': 1,
+    
+    # Thanh sắc (2)
+    'á': 2, 'ắ': 2, 'ấ': 2, 'é': 2, 'ế': 2, 'í': 2, 'ó': 2, 'ố': 2, 'ớ': 2, 'ú': 2, 'ứ': 2, 'ý': 2,
+    
+    # Thanh hỏi (3)
+    'ả': 3, 'ẳ': 3, 'ẩ': 3, 'ẻ': 3, 'ể': 3, 'ỉ': 3, 'ỏ': 3, 'ổ': 3, 'ở': 3, 'ủ': 3, 'ử': 3, 'ỷ': 3,
+    
+    # Thanh ngã (4)
+    'ã': 4, 'ẵ': 4, 'ẫ': 4, 'ẽ': 4, 'ễ': 4, 'ĩ': 4, 'õ': 4, 'ỗ': 4, 'ỡ': 4, 'ũ': 4, 'ữ': 4, 'ỹ': 4,
+    
+    # Thanh nặng (5)
+    'ạ': 5, 'ặ': 5, 'ậ': 5, 'ẹ': 5, 'ệ': 5, 'ị': 5, 'ọ': 5, 'ộ': 5, 'ợ': 5, 'ụ': 5, 'ự': 5, 'ỵ': 5
+})
+
+# Tên thanh điệu
+TONE_NAMES = ('ngang', 'huyền', 'sắc', 'hỏi', 'ngã', 'nặng')
+
+# Ký hiệu thanh điệu theo chuẩn IPA
+TONE_SYMBOLS = ('˧', '˨˩', '˧˥', '˧˩˧', '˧ˀ˥', '˧ˀ')
+
+# Nhãn hiển thị "tên (ký hiệu)" dựng sẵn cho từng thanh
+TONE_LABELS = tuple(f"{name} ({symbol})" for name, symbol in zip(TONE_NAMES, TONE_SYMBOLS))
+
+# Bảng chuyển đổi từ ký tự có dấu sang không dấu (chỉ đọc)
+ACCENT_MAP = MappingProxyType({
+    # Nguyên âm a
+    'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
+    'ằ': 'ă', 'ắ': 'ă', 'ẳ': 'ă', 'ẵ': 'ă', 'ặ': 'ă',
+    'ầ': 'â', 'ấ': 'â', 'ẩ': 'â', 'ẫ': 'â', 'ậ': 'â',
+    
+    # Nguyên âm e
+    'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
+    'ề': 'ê', 'ế': 'ê', 'ể': 'ê', 'ễ': 'ê', 'ệ': 'ê',
+    
+    # Nguyên âm i
+    'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
+    
+    # Nguyên âm o
+    'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
+    'ô': 'o',  # thêm ô không dấu 
+    'ồ': 'ô', 'ố': 'ô', 'ổ': 'ô', 'ỗ': 'ô', 'ộ': 'ô',
+    'ờ': 'ơ', 'ớ': 'ơ', 'ở': 'ơ', 'ỡ': 'ơ', 'ợ': 'ơ',
+    
+    # Nguyên âm u
+    'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
+    'ừ': 'ư', 'ứ': 'ư', 'ử': 'ư', 'ữ': 'ư', 'ự': 'ư',
+    
+    # Thêm xử lý cho nguyên âm đôi
+    'ư': 'u',  # ư không dấu -> u
+    'ơ': 'o',  # ơ không dấu -> o
+    
+    # Nguyên âm y
+    'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y'
+})
+
+# Bảng dịch biên dịch sẵn cho str.translate (bỏ dấu trong một lần quét C)
+_ACCENT_TABLE = str.maketrans(dict(ACCENT_MAP))
+
+# Ký tự mang thanh khác thanh ngang, tìm bằng một regex biên dịch sẵn
+_TONED_CHAR_RE = re.compile('[' + ''.join(ch for ch, code in TONE_MARKS.items() if code) + ']')
 
 
 class ToneHandler:
     """Xử lý nhận dạng và phân loại thanh điệu tiếng Việt"""
     
     def __init__(self):
-        # Bảng ánh xạ từ ký tự có dấu sang thanh điệu
-        self.tone_marks = {
-            # Thanh ngang (0) - không dấu
-            'a': 0, 'ă': 0, 'â': 0, 'e': 0, 'ê': 0, 'i': 0, 'o': 0, 'ô': 0, 'ơ': 0, 'u': 0, 'ư': 0, 'y': 0,
-            
-            # Thanh huyền (1)
-            'à': 1, 'ằ': 1, 'ầ': 1, 'è': 1, 'ề': 1, 'ì': 1, 'ò': 1, 'ồ': 1, 'ờ': 1, 'ù': 1, 'ừ': 1, 'ỳ': 1,
-            
-            # Thanh sắc (2)
-            'á': 2, 'ắ': 2, 'ấ': 2, 'é': 2, 'ế': 2, 'í': 2, 'ó': 2, 'ố': 2, 'ớ': 2, 'ú': 2, 'ứ': 2, 'ý': 2,
-            
-            # Thanh hỏi (3)
-            'ả': 3, 'ẳ': 3, 'ẩ': 3, 'ẻ': 3, 'ể': 3, 'ỉ': 3, 'ỏ': 3, 'ổ': 3, 'ở': 3, 'ủ': 3, 'ử': 3, 'ỷ': 3,
-            
-            # Thanh ngã (4)
-            'ã': 4, 'ẵ': 4, 'ẫ': 4, 'ẽ': 4, 'ễ': 4, 'ĩ': 4, 'õ': 4, 'ỗ': 4, 'ỡ': 4, 'ũ': 4, 'ữ': 4, 'ỹ': 4,
-            
-            # Thanh nặng (5)
-            'ạ': 5, 'ặ': 5, 'ậ': 5, 'ẹ': 5, 'ệ': 5, 'ị': 5, 'ọ': 5, 'ộ': 5, 'ợ': 5, 'ụ': 5, 'ự': 5, 'ỵ': 5
-        }
-        
-        # Tên thanh điệu
-        self.tone_names = ['ngang', 'huyền', 'sắc', 'hỏi', 'ngã', 'nặng']
-        
-        # Ký hiệu thanh điệu theo chuẩn IPA
-        self.tone_symbols = ['˧', '˨˩', '˧˥', '˧˩˧', '˧ˀ˥', '˧ˀ']
+        self.tone_marks = TONE_MARKS
+        self.tone_names = TONE_NAMES
+        self.tone_symbols = TONE_SYMBOLS
     
     def get_tone(self, syllable: str) -> Tuple[int, str]:
         """
@@ -51,20 +129,10 @@ class ToneHandler:
         Returns:
             Tuple của (mã thanh điệu, tên thanh điệu)
         """
-        # Tìm tất cả thanh điệu trong âm tiết và chọn thanh điệu khác thanh ngang đầu tiên
-        tones_found = []
-        for char in syllable.lower():
-            if char in self.tone_marks:
-                tone_code = self.tone_marks[char]
-                tones_found.append(tone_code)
-        
-        # Nếu có thanh điệu khác thanh ngang (0), ưu tiên thanh điệu đó
-        for tone_code in tones_found:
-            if tone_code != 0:
-                return tone_code, self.tone_names[tone_code]
-        
-        # Nếu chỉ có thanh ngang hoặc không có thanh điệu nào
-        return 0, self.tone_names[0]  # Mặc định thanh ngang
+        # Ưu tiên ký tự mang thanh khác thanh ngang đầu tiên, mặc định thanh ngang
+        match = _TONED_CHAR_RE.search(syllable.lower())
+        tone_code = TONE_MARKS[match.group()] if match else 0
+        return tone_code, TONE_NAMES[tone_code]
     
     def remove_tone_marks(self, text: str) -> str:
         """
@@ -76,134 +144,226 @@ class ToneHandler:
         Returns:
             Văn bản không dấu thanh điệu
         """
-        # Bảng chuyển đổi từ ký tự có dấu sang không dấu
-        accent_map = {
-            # Nguyên âm a
-            'à': 'a', 'á': 'a', 'ả': 'a', 'ã': 'a', 'ạ': 'a',
-            'ằ': 'ă', 'ắ': 'ă', 'ẳ': 'ă', 'ẵ': 'ă', 'ặ': 'ă',
-            'ầ': 'â', 'ấ': 'â', 'ẩ': 'â', 'ẫ': 'â', 'ậ': 'â',
-            
-            # Nguyên âm e
-            'è': 'e', 'é': 'e', 'ẻ': 'e', 'ẽ': 'e', 'ẹ': 'e',
-            'ề': 'ê', 'ế': 'ê', 'ể': 'ê', 'ễ': 'ê', 'ệ': 'ê',
-            
-            # Nguyên âm i
-            'ì': 'i', 'í': 'i', 'ỉ': 'i', 'ĩ': 'i', 'ị': 'i',
-            
-            # Nguyên âm o
-            'ò': 'o', 'ó': 'o', 'ỏ': 'o', 'õ': 'o', 'ọ': 'o',
-            'ô': 'o',  # thêm ô không dấu 
-            'ồ': 'ô', 'ố': 'ô', 'ổ': 'ô', 'ỗ': 'ô', 'ộ': 'ô',
-            'ờ': 'ơ', 'ớ': 'ơ', 'ở': 'ơ', 'ỡ': 'ơ', 'ợ': 'ơ',
-            
-            # Nguyên âm u
-            'ù': 'u', 'ú': 'u', 'ủ': 'u', 'ũ': 'u', 'ụ': 'u',
-            'ừ': 'ư', 'ứ': 'ư', 'ử': 'ư', 'ữ': 'ư', 'ự': 'ư',
-            
-            # Thêm xử lý cho nguyên âm đôi
-            'ư': 'u',  # ư không dấu -> u
-            'ơ': 'o',  # ơ không dấu -> o
-            
-            # Nguyên âm y
-            'ỳ': 'y', 'ý': 'y', 'ỷ': 'y', 'ỹ': 'y', 'ỵ': 'y'
-        }
-        
-        result = ''
-        for char in text:
-            result += accent_map.get(char, char)
+        return text.translate(_ACCENT_TABLE)
+    
+    def split_tone(self, syllable: str) -> Tuple[int, str]:
+        """
+        Tách thanh điệu và dạng gốc không dấu của âm tiết trong một lần gọi
         
-        return result
+        Args:
+            syllable: Âm tiết tiếng Việt
+            
+        Returns:
+            Tuple của (mã thanh điệu, âm tiết chữ thường đã bỏ dấu)
+        """
+        lower = syllable.lower()
+        match = _TONED_CHAR_RE.search(lower)
+        return (TONE_MARKS[match.group()] if match else 0), lower.translate(_ACCENT_TABLE)
+
+
+def _build_phoneme_tables() -> Dict[str, MappingProxyType]:
+    """Dựng các bảng ánh xạ chữ viết -> âm vị (chỉ gọi một lần, qua phoneme_tables)"""
+    # Hệ thống âm đầu (22 âm vị)
+    initial_consonants = {
+        'b': '/b-/',
+        'm': '/m-/',
+        'ph': '/f-/',
+        'v': '/v-/',
+        't': '/t-/',
+        'th': '/tʼ-/',
+        'đ': '/d-/',
+        'n': '/n-/',
+        'd': '/z-/',     # trường hợp d không phải đ
+        'gi': '/z-/',    # gi phát âm như z
+        'r': '/ʐ-/',
+        'x': '/s-/',
+        's': '/ʂ-/',
+        'ch': '/c-/',
+        'tr': '/ʈ-/',
+        'nh': '/ɲ-/',
+        'l': '/l-/',
+        'k': '/k-/',
+        'q': '/k-/',     # qu phát âm như k + w
+        'c': '/k-/',
+        'kh': '/χ-/',
+        'ngh': '/ŋ-/',   # trước i, e, ê
+        'ng': '/ŋ-/',    # trường hợp còn lại
+        'gh': '/ɣ-/',    # trước i, e, ê  
+        'g': '/ɣ-/',     # trường hợp còn lại
+        'h': '/h-/',
+        '': '/ʔ-/'       # âm đầu rỗng (thanh quản bế)
+    }
+    
+    # Hệ thống âm đệm (2 âm vị)
+    medial_consonants = {
+        'w': '/-w-/',    # âm đệm u/o
+        '': '/zero/'     # không có âm đệm
+    }
+    
+    # Hệ thống âm chính (16 âm vị)
+    vowels = {
+        'i': '/-i-/',
+        'y': '/-i-/',     # trong một số trường hợp
+        'ê': '/-e-/',
+        'e': '/-ɛ-/',
+        'ư': '/-ɯ-/',
+        'ơ': '/-ɤ-/',
+        'a': '/-a-/',     # hoặc /-ă-/, /-ɛ̈-/ tùy ngữ cảnh
+        'ă': '/-ă-/',
+        'â': '/-ɤ̈-/',
+        'u': '/-u-/',
+        'ô': '/-o-/',
+        'o': '/-ɔ-/',     # hoặc /-ɔ̈-/ tùy ngữ cảnh
+        'iê': '/-ie-/',   # nguyên âm đôi
+        'ia': '/-ie-/',
+        'yê': '/-ie-/',
+        'ya': '/-ie-/',
+        'ươ': '/-ɯɤ-/',   # nguyên âm đôi
+        'ưa': '/-ɯɤ-/',
+        'uô': '/-uo-/',   # nguyên âm đôi
+        'ua': '/-uo-/'
+    }
+    
+    # Hệ thống âm cuối (9 âm vị)
+    final_consonants = {
+        'm': '/-m/',
+        'n': '/-n/',
+        'p': '/-p/',
+        't': '/-t/',
+        'nh': '/-ŋ/',     # sau i, e, anh
+        'ng': '/-ŋ/',     # trường hợp còn lại
+        'ch': '/-k/',     # sau i, e, ach
+        'c': '/-k/',      # trường hợp còn lại
+        'o': '/-w/',      # âm cuối o sau a, e
+        'u': '/-w/',      # âm cuối u
+        'y': '/-j/',      # âm cuối y sau ă, â
+        'i': '/-j/',      # âm cuối i
+        '': '/zero/'      # không có âm cuối
+    }
+    
+    return {
+        'initial': MappingProxyType(initial_consonants),
+        'medial': MappingProxyType(medial_consonants),
+        'nucleus': MappingProxyType(vowels),
+        'final': MappingProxyType(final_consonants)
+    }
+
+
+_PHONEME_TABLES = None
+
+
+def phoneme_tables() -> Dict[str, MappingProxyType]:
+    """
+    Bảng ánh xạ âm vị dùng chung, chỉ đọc, dựng ở lần gọi đầu tiên
+    
+    Returns:
+        Dictionary 'initial', 'medial', 'nucleus', 'final' -> bảng ánh xạ
+    """
+    global _PHONEME_TABLES
+    if _PHONEME_TABLES is None:
+        _PHONEME_TABLES = _build_phoneme_tables()
+    return _PHONEME_TABLES
 
 
 class PhonemeMapper:
     """Bảng ánh xạ từ chữ viết tiếng Việt sang ký hiệu âm vị IPA"""
     
     def __init__(self):
-        # Hệ thống âm đầu (22 âm vị)
-        self.initial_consonants = {
-            'b': '/b-/',
-            'm': '/m-/',
-            'ph': '/f-/',
-            'v': '/v-/',
-            't': '/t-/',
-            'th': '/tʼ-/',
-            'đ': '/d-/',
-            'n': '/n-/',
-            'd': '/z-/',     # trường hợp d không phải đ
-            'gi': '/z-/',    # gi phát âm như z
-            'r': '/ʐ-/',
-            'x': '/s-/',
-            's': '/ʂ-/',
-            'ch': '/c-/',
-            'tr': '/ʈ-/',
-            'nh': '/ɲ-/',
-            'l': '/l-/',
-            'k': '/k-/',
-            'q': '/k-/',     # qu phát âm như k + w
-            'c': '/k-/',
-            'kh': '/χ-/',
-            'ngh': '/ŋ-/',   # trước i, e, ê
-            'ng': '/ŋ-/',    # trường hợp còn lại
-            'gh': '/ɣ-/',    # trước i, e, ê  
-            'g': '/ɣ-/',     # trường hợp còn lại
-            'h': '/h-/',
-            '': '/ʔ-/'       # âm đầu rỗng (thanh quản bế)
-        }
-        
-        # Hệ thống âm đệm (2 âm vị)
-        self.medial_consonants = {
-            'w': '/-w-/',    # âm đệm u/o
-            '': '/zero/'     # không có âm đệm
-        }
+        # Mọi instance dùng chung các bảng chỉ đọc ở mức module
+        tables = phoneme_tables()
+        self.initial_consonants = tables['initial']
+        self.medial_consonants = tables['medial']
+        self.vowels = tables['nucleus']
+        self.final_consonants = tables['final']
+
+
+# Danh sách âm đầu theo thứ tự độ dài giảm dần để tránh nhầm lẫn
+INITIALS = ['ngh', 'ng', 'gh', 'kh', 'th', 'ph', 'tr', 'ch', 'nh', 'gi', 'qu',
+            'b', 'm', 'v', 't', 'đ', 'n', 'd', 'r', 'x', 's', 'l', 'k', 'c', 'g', 'h']
+
+# Regex biên dịch sẵn khớp âm đầu trong một lần quét (thứ tự nhánh = thứ tự ưu tiên)
+_INITIAL_RE = re.compile('|'.join(INITIALS))
+
+# Âm cuối 2 ký tự và 1 ký tự, tra theo hậu tố thay cho vòng lặp endswith
+_CONTEXT_FINALS = frozenset(['nh', 'ch'])     # chỉ sau i, e hoặc có a phía trước
+_STOP_NASAL_FINALS = frozenset('cptmn')
+_GLIDE_FINALS = frozenset('uoiy')             # chỉ khi có nguyên âm khác phía trước
+_GLIDE_CONTEXT_RE = re.compile('[aeêăâơôư]')
+
+# Tiền tố tách âm đệm: 2 ký tự đầu -> âm đệm
+_MEDIAL_PREFIXES = {'uo': 'u', 'ua': 'u', 'uô': 'u', 'oa': 'o', 'oe': 'o'}
+
+# Nguyên âm đôi giữ nguyên 2 ký tự làm âm chính
+_DIPHTHONGS = frozenset(['iê', 'ia', 'yê', 'ya', 'ươ', 'ưa', 'uô', 'ua'])
+
+
+class StageStats:
+    """Bộ đếm số lần gọi, thời gian tích lũy theo giai đoạn và số lần rơi vào nhánh fallback"""
+    
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.fallbacks = defaultdict(int)
+    
+    def record(self, stage: str, elapsed: float) -> None:
+        """Ghi một lần gọi giai đoạn stage mất elapsed giây"""
+        self.calls[stage] += 1
+        self.seconds[stage] += elapsed
+    
+    def count_fallback(self, branch: str) -> None:
+        """Đếm một lần ánh xạ rơi vào nhánh fallback"""
+        self.fallbacks[branch] += 1
+    
+    def timed(self, stage: str, func):
+        """Bọc func để mỗi lần gọi được ghi vào giai đoạn stage (không đổi kết quả)"""
+        clock = time.perf_counter
+        record = self.record
         
-        # Hệ thống âm chính (16 âm vị)
-        self.vowels = {
-            'i': '/-i-/',
-            'y': '/-i-/',     # trong một số trường hợp
-            'ê': '/-e-/',
-            'e': '/-ɛ-/',
-            'ư': '/-ɯ-/',
-            'ơ': '/-ɤ-/',
-            'a': '/-a-/',     # hoặc /-ă-/, /-ɛ̈-/ tùy ngữ cảnh
-            'ă': '/-ă-/',
-            'â': '/-ɤ̈-/',
-            'u': '/-u-/',
-            'ô': '/-o-/',
-            'o': '/-ɔ-/',     # hoặc /-ɔ̈-/ tùy ngữ cảnh
-            'iê': '/-ie-/',   # nguyên âm đôi
-            'ia': '/-ie-/',
-            'yê': '/-ie-/',
-            'ya': '/-ie-/',
-            'ươ': '/-ɯɤ-/',   # nguyên âm đôi
-            'ưa': '/-ɯɤ-/',
-            'uô': '/-uo-/',   # nguyên âm đôi
-            'ua': '/-uo-/'
-        }
+        def wrapper(*args):
+            start = clock()
+            result = func(*args)
+            record(stage, clock() - start)
+            return result
         
-        # Hệ thống âm cuối (9 âm vị)
-        self.final_consonants = {
-            'm': '/-m/',
-            'n': '/-n/',
-            'p': '/-p/',
-            't': '/-t/',
-            'nh': '/-ŋ/',     # sau i, e, anh
-            'ng': '/-ŋ/',     # trường hợp còn lại
-            'ch': '/-k/',     # sau i, e, ach
-            'c': '/-k/',      # trường hợp còn lại
-            'o': '/-w/',      # âm cuối o sau a, e
-            'u': '/-w/',      # âm cuối u
-            'y': '/-j/',      # âm cuối y sau ă, â
-            'i': '/-j/',      # âm cuối i
-            '': '/zero/'      # không có âm cuối
+        return wrapper
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """Bản sao số liệu hiện tại"""
+        return {
+            'stages': {stage: {'calls': self.calls[stage], 'seconds': self.seconds[stage]}
+                       for stage in self.calls},
+            'fallbacks': dict(self.fallbacks)
         }
+    
+    def reset(self) -> None:
+        """Đặt lại toàn bộ bộ đếm"""
+        self.calls.clear()
+        self.seconds.clear()
+        self.fallbacks.clear()
 
 
 class SyllableAnalyzer:
     """Phân tích âm tiết tiếng Việt thành các thành phần âm vị"""
     
-    def __init__(self):
+    INITIALS = INITIALS
+    
+    def __init__(self, stats: Optional[StageStats] = None):
+        """
+        Args:
+            stats: Bộ đếm theo giai đoạn; None để tắt đo đạc
+        """
         self.tone_handler = ToneHandler()
         self.phoneme_mapper = PhonemeMapper()
+        self.stats = stats
+        self._split_tone = self.tone_handler.split_tone
+        if stats is not None:
+            # Đo bằng cách bọc các bước dùng chung (thuộc tính instance che phương thức),
+            # không giữ bản sao riêng của luật phân tích
+            self._split_tone = stats.timed('tone', self._split_tone)
+            self._extract_initial = stats.timed('initial', self._extract_initial)
+            self._extract_final = stats.timed('final', self._extract_final)
+            self._extract_medial_nucleus = stats.timed('medial_nucleus',
+                                                       self._extract_medial_nucleus)
     
     def split_syllable(self, syllable: str) -> Dict[str, str]:
         """
@@ -215,94 +375,75 @@ class SyllableAnalyzer:
         Returns:
             Dictionary chứa các thành phần âm vị
         """
-        # Loại bỏ dấu thanh điệu để phân tích cấu trúc
-        clean_syllable = self.tone_handler.remove_tone_marks(syllable.lower())
+        # Xác định thanh điệu và loại bỏ dấu thanh để phân tích cấu trúc
+        tone_code, clean_syllable = self._split_tone(syllable)
+        initial, medial, nucleus, final = self.parse(clean_syllable)
         
-        result = {
-            'initial': '',
-            'medial': '',
-            'nucleus': '',
-            'final': '',
-            'tone': '',
+        return {
+            'initial': initial,
+            'medial': medial,
+            'nucleus': nucleus,
+            'final': final,
+            'tone': TONE_LABELS[tone_code],
             'original': syllable
         }
+    
+    def parse(self, clean_syllable: str) -> Tuple[str, str, str, str]:
+        """
+        Tách âm tiết đã bỏ dấu thanh trong một lượt: âm đầu khớp bằng regex
+        biên dịch sẵn, âm cuối và âm đệm tra theo hậu tố/tiền tố
         
-        # Xác định thanh điệu
-        tone_code, tone_name = self.tone_handler.get_tone(syllable)
-        result['tone'] = f"{tone_name} ({self.tone_handler.tone_symbols[tone_code]})"
-        
-        # Phân tích âm đầu
+        Args:
+            clean_syllable: Âm tiết chữ thường không dấu thanh
+            
+        Returns:
+            Tuple (âm đầu, âm đệm, âm chính, âm cuối)
+        """
         initial = self._extract_initial(clean_syllable)
-        result['initial'] = initial
-        remaining = clean_syllable[len(initial):] if initial else clean_syllable
+        remaining = clean_syllable[len(initial):]
         
-        # Phân tích âm cuối
         final = self._extract_final(remaining)
-        result['final'] = final
-        remaining = remaining[:-len(final)] if final else remaining
+        if final:
+            remaining = remaining[:-len(final)]
         
-        # Phân tích âm đệm và âm chính
         medial, nucleus = self._extract_medial_nucleus(remaining, initial)
-        result['medial'] = medial
-        result['nucleus'] = nucleus
-        
-        return result
+        return initial, medial, nucleus, final
     
     def _extract_initial(self, syllable: str) -> str:
         """Trích xuất âm đầu từ âm tiết"""
-        # Danh sách âm đầu theo thứ tự độ dài giảm dần để tránh nhầm lẫn
-        initials = ['ngh', 'ng', 'gh', 'kh', 'th', 'ph', 'tr', 'ch', 'nh', 'gi', 'qu',
-                   'b', 'm', 'v', 't', 'đ', 'n', 'd', 'r', 'x', 's', 'l', 'k', 'c', 'g', 'h']
-        
-        for initial in initials:
-            if syllable.startswith(initial):
-                # Xử lý trường hợp đặc biệt cho k, q, c
-                if initial == 'qu':
-                    return 'qu'
-                elif initial == 'k' and len(syllable) > 1:
-                    next_vowel = syllable[1:2]
-                    if next_vowel in ['i', 'e', 'ê']:
-                        return 'k'
-                elif initial == 'c' and len(syllable) > 1:
-                    next_vowel = syllable[1:2]
-                    if next_vowel not in ['h']:  # không phải ch
-                        return 'c'
-                elif initial == 'g' and len(syllable) > 1:
-                    if syllable[1:2] not in ['h', 'i']:  # không phải gh hoặc gi
-                        return 'g'
-                elif initial == 'd' and len(syllable) > 1:
-                    if syllable[1:2] != 'đ':  # không phải đ
-                        return 'd'
-                else:
-                    return initial
-        
-        return ''  # Không có âm đầu (âm đầu rỗng)
+        match = _INITIAL_RE.match(syllable)
+        if match is None:
+            return ''  # Không có âm đầu (âm đầu rỗng)
+        
+        initial = match.group()
+        if len(syllable) > 1:
+            # k chỉ đứng trước i, e, ê; "dđ" không phải âm đầu d
+            if initial == 'k' and syllable[1] not in 'ieê':
+                return ''
+            if initial == 'd' and syllable[1] == 'đ':
+                return ''
+        return initial
     
     def _extract_final(self, syllable: str) -> str:
         """Trích xuất âm cuối từ âm tiết"""
-        finals = ['nh', 'ng', 'ch', 'c', 'p', 't', 'm', 'n', 'u', 'o', 'i', 'y']
-        
-        for final in finals:
-            if syllable.endswith(final) and len(syllable) > 1:
-                # Kiểm tra ngữ cảnh cho nh/ng và ch/c
-                if final == 'nh':
-                    # nh sau i, e, anh
-                    vowel_part = syllable[:-2]
-                    if vowel_part.endswith(('i', 'e')) or 'a' in vowel_part:
-                        return 'nh'
-                elif final == 'ch':
-                    # ch sau i, e, ach
-                    vowel_part = syllable[:-2]
-                    if vowel_part.endswith(('i', 'e')) or 'a' in vowel_part:
-                        return 'ch'
-                elif final in ['ng', 'c', 'p', 't', 'm', 'n']:
-                    return final
-                elif final in ['u', 'o', 'i', 'y']:
-                    # Chỉ coi u, o, i, y là âm cuối khi có nguyên âm khác phía trước
-                    vowel_part = syllable[:-1]
-                    if len(vowel_part) > 0 and any(v in vowel_part for v in ['a', 'e', 'ê', 'ă', 'â', 'ơ', 'ô', 'ư']):
-                        return final
+        if len(syllable) < 2:
+            return ''
         
+        tail = syllable[-2:]
+        if tail in _CONTEXT_FINALS:
+            # nh/ch sau i, e hoặc có a (anh, ach)
+            vowel_part = syllable[:-2]
+            if vowel_part.endswith(('i', 'e')) or 'a' in vowel_part:
+                return tail
+            return ''
+        if tail == 'ng':
+            return 'ng'
+        
+        last = syllable[-1]
+        if last in _STOP_NASAL_FINALS:
+            return last
+        if last in _GLIDE_FINALS and _GLIDE_CONTEXT_RE.search(syllable, 0, len(syllable) - 1):
+            return last
         return ''  # Không có âm cuối
     
     def _extract_medial_nucleus(self, remaining: str, initial: str) -> Tuple[str, str]:
@@ -310,35 +451,523 @@ class SyllableAnalyzer:
         medial = ''
         nucleus = remaining
         
-        # Xử lý âm đệm u/o
+        # Xử lý âm đệm u/o (qu luôn có âm đệm u)
         if initial == 'qu':
-            medial = 'u'  # qu có âm đệm u
-            nucleus = remaining
-        elif remaining.startswith(('uo', 'ua', 'uô')):
             medial = 'u'
-            nucleus = remaining[1:]
-        elif remaining.startswith(('ươ', 'ưa')):
-            medial = ''  # không có âm đệm riêng
-            nucleus = remaining
-        elif remaining.startswith('oa') or remaining.startswith('oe'):
-            medial = 'o'
-            nucleus = remaining[1:]
+        else:
+            medial = _MEDIAL_PREFIXES.get(remaining[:2], '')
+            if medial:
+                nucleus = remaining[1:]
         
         # Nhận dạng nguyên âm đôi
-        if nucleus.startswith(('iê', 'ia', 'yê', 'ya')):
-            nucleus = nucleus[:2] if len(nucleus) >= 2 else nucleus
-        elif nucleus.startswith(('ươ', 'ưa', 'uô', 'ua')):
-            nucleus = nucleus[:2] if len(nucleus) >= 2 else nucleus
+        if nucleus[:2] in _DIPHTHONGS:
+            nucleus = nucleus[:2]
         
         return medial, nucleus
 
 
+def to_nfc(text: str) -> str:
+    """
+    Chuẩn hóa văn bản về NFC (dấu dựng sẵn) để khớp các bảng thanh điệu
+    
+    Đường nhanh: văn bản ASCII hoặc đã ở dạng NFC được trả về nguyên vẹn,
+    chỉ tốn một lần kiểm tra trong C.
+    """
+    if text.isascii() or unicodedata.is_normalized('NFC', text):
+        return text
+    return unicodedata.normalize('NFC', text)
+
+
+# Âm tiết: chuỗi ký tự chữ/số (kể cả dấu tổ hợp của văn bản NFD), có thể chứa dấu câu
+# xen giữa (bị loại khi tách) nhưng bị ngắt bởi khoảng trắng và dấu gạch nối
+# (a-đrê-na-lin -> a, đrê, na, lin). Mỗi đoạn phải bắt đầu bằng ký tự chữ/số để dấu
+# tổ hợp đứng lẻ (vd. "x \u0301 y") không thành âm tiết rỗng.
+# Regex chỉ dùng cho từ (giữa hai khoảng trắng) có gạch nối/dấu câu/dấu tổ hợp; từ
+# toàn chữ/số (đa số) chính là một âm tiết. \s của re trùng với str.isspace nên tách
+# theo str.split() rồi quét từng từ cho cùng kết quả với quét cả văn bản.
+_SYLLABLE_RE = re.compile(r'\w[\w\u0300-\u036f]*'
+                          r'(?:[^\w\s\-\u2010\u2011\u0300-\u036f]+\w[\w\u0300-\u036f]*)*')
+_INNER_PUNCT_RE = re.compile(r'[^\w]+')
+
+
+def tokenize(text: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Tách âm tiết trong một lần quét bằng regex biên dịch sẵn, không sao chép văn bản
+    
+    Args:
+        text: Văn bản tiếng Việt
+        
+    Yields:
+        (âm tiết NFC, start, end) theo vị trí trong văn bản gốc
+    """
+    # Kiểm tra NFC một lần cho cả văn bản; chỉ văn bản lẫn dạng NFD mới chuẩn hóa từng âm tiết
+    needs_nfc = not (text.isascii() or unicodedata.is_normalized('NFC', text))
+    end = 0
+    for word in text.split():
+        # Giữa end và từ tiếp theo chỉ có khoảng trắng nên find trả về đúng vị trí
+        start = text.find(word, end)
+        end = start + len(word)
+        if word.isalnum():
+            yield (unicodedata.normalize('NFC', word) if needs_nfc else word), start, end
+            continue
+        for match in _SYLLABLE_RE.finditer(text, start, end):
+            syllable = match.group()
+            if needs_nfc:
+                syllable = unicodedata.normalize('NFC', syllable)
+            if not syllable.isalnum():
+                # Hiếm: dấu câu hoặc dấu tổ hợp lẻ xen giữa âm tiết
+                syllable = _INNER_PUNCT_RE.sub('', syllable)
+            yield syllable, match.start(), match.end()
+
+
+# Dấu thanh dạng tổ hợp (NFD) theo mã thanh điệu 0..5
+TONE_COMBINING_MARKS = ('', '\u0300', '\u0301', '\u0309', '\u0303', '\u0323')
+
+# Nguyên âm mang dấu phụ được ưu tiên đặt dấu thanh
+_MODIFIED_VOWELS = 'ăâêôơư'
+_VOWELS = 'aăâeêioôơuưy'
+
+
+def load_rimes(path: str = RIMES_FILE) -> List[str]:
+    """Đọc danh sách vần (dạng NFC, không dấu thanh), giữ thứ tự trong file"""
+    rimes = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            rime = unicodedata.normalize('NFC', line.strip())
+            if rime and rime not in rimes:
+                rimes.append(rime)
+    return rimes
+
+
+def load_syllables(path: str = GROUNDTRUTH_FILE) -> List[str]:
+    """Đọc danh sách âm tiết, mỗi dòng một âm tiết"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def tone_positions(rime: str) -> List[int]:
+    """
+    Xác định vị trí đặt dấu thanh trong vần
+    
+    Trả về cả kiểu cũ (hoà) và kiểu mới (hòa) cho các vần mở oa, oe, uy.
+    """
+    vowel_idx = [i for i, ch in enumerate(rime) if ch in _VOWELS]
+    if not vowel_idx:
+        return []
+    modified = [i for i in vowel_idx if rime[i] in _MODIFIED_VOWELS]
+    if modified:
+        return [modified[-1]]          # ươ -> ơ, uyê -> ê
+    if rime[-1] not in _VOWELS:
+        return [vowel_idx[-1]]         # vần đóng: nguyên âm cuối
+    if len(vowel_idx) == 1:
+        return vowel_idx
+    if len(vowel_idx) == 2:
+        return vowel_idx if rime in ('oa', 'oe', 'uy') else [vowel_idx[0]]
+    return [vowel_idx[1]]              # oai, uya, oeo: nguyên âm giữa
+
+
+def enumerate_syllables(rimes: List[str]) -> Iterator[str]:
+    """
+    Liệt kê mọi tổ hợp âm đầu × vần × thanh hợp lệ về chính tả
+    
+    Args:
+        rimes: Danh sách vần không dấu thanh
+        
+    Yields:
+        Âm tiết có dấu thanh (NFC)
+    """
+    for initial in INITIALS + ['']:
+        for rime in rimes:
+            # k, gh, ngh chỉ đứng trước i, e, ê, y; qu không đi với âm đệm o/u
+            if initial in ('k', 'gh', 'ngh') and rime[0] not in 'ieêy':
+                continue
+            if initial == 'qu' and rime[0] in 'ou':
+                continue
+            # Vần kết thúc bằng âm tắc chỉ mang thanh sắc hoặc nặng
+            stop_final = rime.endswith(('c', 'ch', 'p', 't'))
+            yield initial + rime
+            for tone_code in range(1, 6):
+                if stop_final and tone_code not in (2, 5):
+                    continue
+                for i in tone_positions(rime):
+                    toned = unicodedata.normalize(
+                        'NFC', rime[i] + TONE_COMBINING_MARKS[tone_code])
+                    yield initial + rime[:i] + toned + rime[i + 1:]
+
+
+# Bảng phiên âm đã biên dịch theo file vần, dùng chung trong tiến trình
+_SHARED_TABLE_ENTRIES: Dict[str, MappingProxyType] = {}
+
+
+class TranscriptionTable:
+    """
+    Bảng phiên âm đóng biên dịch sẵn: một lần tra băm cho mỗi âm tiết
+
+    MappingProxyType chỉ chặn thêm/xóa khóa; các dict kết quả bên trong vẫn
+    sửa được và được dùng chung giữa mọi instance (xem shared), nên người gọi
+    không được sửa đổi kết quả trả về.
+    """
+    
+    def __init__(self, entries: Dict[str, Dict], track_misses: bool = False):
+        """
+        Args:
+            entries: Ánh xạ âm tiết -> kết quả phiên âm
+            track_misses: Đếm số lần tra trúng/trượt bảng
+        """
+        self.entries = entries if isinstance(entries, MappingProxyType) else MappingProxyType(entries)
+        self.track_misses = track_misses
+        self.hits = 0
+        self.misses = 0
+    
+    @classmethod
+    def build(cls, transcribe, rimes_path: str = RIMES_FILE,
+              track_misses: bool = False) -> 'TranscriptionTable':
+        """
+        Chạy bộ phân tích theo luật trên mọi âm tiết liệt kê được
+        
+        Args:
+            transcribe: Hàm phiên âm theo luật (syllable -> dict)
+            rimes_path: Đường dẫn file vần
+            track_misses: Đếm số lần tra trúng/trượt bảng
+        """
+        entries = {}
+        for syllable in enumerate_syllables(load_rimes(rimes_path)):
+            if syllable not in entries:
+                entries[syllable] = transcribe(syllable)
+        return cls(entries, track_misses)
+    
+    @classmethod
+    def shared(cls, transcribe, rimes_path: str = RIMES_FILE,
+               track_misses: bool = False) -> 'TranscriptionTable':
+        """
+        Như build nhưng chỉ biên dịch một lần cho mỗi file vần; các instance
+        sau dùng chung bảng chỉ đọc, mỗi instance có bộ đếm trúng/trượt riêng
+        """
+        entries = _SHARED_TABLE_ENTRIES.get(rimes_path)
+        if entries is None:
+            entries = cls.build(transcribe, rimes_path).entries
+            _SHARED_TABLE_ENTRIES[rimes_path] = entries
+        return cls(entries, track_misses)
+    
+    def get(self, syllable: str) -> Optional[Dict]:
+        """Tra kết quả phiên âm, None nếu âm tiết nằm ngoài bảng"""
+        result = self.entries.get(syllable)
+        if self.track_misses:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+    
+    def info(self) -> Dict[str, float]:
+        """Thống kê kích thước bảng và tỉ lệ tra trượt"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'miss_rate': self.misses / lookups if lookups else 0.0
+        }
+    
+    def __contains__(self, syllable: str) -> bool:
+        return syllable in self.entries
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class SymbolTable:
+    """Bảng ký hiệu nội trú: ánh xạ hai chiều giữa giá trị và id số nguyên nhỏ"""
+    
+    __slots__ = ('_ids', '_values', 'limit')
+    
+    def __init__(self, limit: Optional[int] = None):
+        """
+        Args:
+            limit: Số giá trị tối đa được cấp id (None = không giới hạn); khi đầy,
+                   giá trị mới không được nội trú mà được trả về nguyên dạng
+        """
+        self._ids = {}
+        self._values = []
+        self.limit = limit
+    
+    def intern(self, value):
+        """Trả về id của giá trị, cấp id mới nếu chưa có (chính giá trị nếu bảng đầy)"""
+        symbol_id = self._ids.get(value)
+        if symbol_id is None:
+            if self.limit is not None and len(self._values) >= self.limit:
+                return value
+            symbol_id = len(self._values)
+            self._ids[value] = symbol_id
+            self._values.append(value)
+        return symbol_id
+    
+    def id_of(self, value) -> Optional[int]:
+        """Id của giá trị đã nội trú (None nếu chưa có)"""
+        return self._ids.get(value)
+    
+    def values(self) -> List:
+        """Các giá trị theo thứ tự id"""
+        return list(self._values)
+    
+    def __getitem__(self, symbol_id):
+        # Giá trị không được nội trú (bảng đầy) đã là chính nó
+        return self._values[symbol_id] if symbol_id.__class__ is int else symbol_id
+    
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+# Bảng ký hiệu dùng chung cho từng thành phần: id -> (chữ viết, ký hiệu âm vị).
+# Giới hạn kích thước để đầu vào rác (âm chính fallback) không làm bảng tăng mãi;
+# bộ từ vựng thật chỉ vài chục giá trị mỗi thành phần
+SLOT_NAMES = ('initial', 'medial', 'nucleus', 'final')
+MAX_SLOT_SYMBOLS = 1024
+SLOT_SYMBOLS = {slot: SymbolTable(MAX_SLOT_SYMBOLS) for slot in SLOT_NAMES}
+
+
+class CompactTranscription(NamedTuple):
+    """
+    Kết quả phiên âm gọn: chỉ lưu id số nguyên của từng thành phần,
+    chuỗi hiển thị được dựng khi cần từ SLOT_SYMBOLS. Khi bảng ký hiệu đã đầy,
+    thành phần mới lưu thẳng cặp (chữ viết, ký hiệu âm vị) thay cho id.
+    """
+    original: str
+    initial: int
+    medial: int
+    nucleus: int
+    final: int
+    tone: int
+    
+    @property
+    def components(self) -> Dict[str, str]:
+        """Các thành phần chữ viết (giống kết quả split_syllable)"""
+        return {
+            'initial': SLOT_SYMBOLS['initial'][self.initial][0],
+            'medial': SLOT_SYMBOLS['medial'][self.medial][0],
+            'nucleus': SLOT_SYMBOLS['nucleus'][self.nucleus][0],
+            'final': SLOT_SYMBOLS['final'][self.final][0],
+            'tone': TONE_LABELS[self.tone],
+            'original': self.original
+        }
+    
+    @property
+    def phonemes(self) -> Dict[str, str]:
+        """Ký hiệu âm vị của từng thành phần"""
+        return {
+            'initial': SLOT_SYMBOLS['initial'][self.initial][1],
+            'medial': SLOT_SYMBOLS['medial'][self.medial][1],
+            'nucleus': SLOT_SYMBOLS['nucleus'][self.nucleus][1],
+            'final': SLOT_SYMBOLS['final'][self.final][1],
+            'tone': TONE_LABELS[self.tone]
+        }
+    
+    @property
+    def full_transcription(self) -> str:
+        """Chuỗi phiên âm hoàn chỉnh"""
+        medial = SLOT_SYMBOLS['medial'][self.medial][1]
+        final = SLOT_SYMBOLS['final'][self.final][1]
+        return ''.join((
+            SLOT_SYMBOLS['initial'][self.initial][1],
+            medial if medial != '/zero/' else '',
+            SLOT_SYMBOLS['nucleus'][self.nucleus][1],
+            final if final != '/zero/' else '',
+            ' ',
+            TONE_LABELS[self.tone]
+        ))
+    
+    def to_dict(self) -> Dict:
+        """Chuyển sang dạng dictionary như transcribe_syllable"""
+        return {
+            'original': self.original,
+            'components': self.components,
+            'phonemes': self.phonemes,
+            'full_transcription': self.full_transcription
+        }
+
+
+# Thứ tự cột của ma trận đặc trưng
+FEATURE_SLOTS = ('initial', 'medial', 'nucleus', 'final', 'tone')
+
+# Giá trị đánh dấu thành phần nằm ngoài bộ từ vựng
+UNKNOWN_ID = -1
+
+
+class FeatureEncoder:
+    """Mã hóa âm tiết thành mảng NumPy (N, 5) id phân loại, không dựng chuỗi"""
+    
+    def __init__(self, transcriber: 'VietnamesePhonemeTranscriber',
+                 cache_size: Optional[int] = 8192):
+        """
+        Args:
+            transcriber: Bộ phiên âm cung cấp bộ phân tích và bảng ánh xạ
+            cache_size: Số âm tiết giữ trong bộ nhớ đệm dòng đặc trưng
+        """
+        if _import_numpy() is None:
+            raise ImportError("FeatureEncoder cần numpy: pip install numpy")
+        
+        self.transcriber = transcriber
+        mapper = transcriber.phoneme_mapper
+        # Bộ từ vựng id theo ký hiệu âm vị của PhonemeMapper (bỏ trùng, giữ thứ tự)
+        self.vocabularies = {
+            'initial': list(dict.fromkeys(mapper.initial_consonants.values())),
+            'medial': list(dict.fromkeys(mapper.medial_consonants.values())),
+            'nucleus': list(dict.fromkeys(mapper.vowels.values())),
+            'final': list(dict.fromkeys(mapper.final_consonants.values())),
+            'tone': list(TONE_NAMES)
+        }
+        self._vocab_ids = {slot: {symbol: i for i, symbol in enumerate(vocab)}
+                           for slot, vocab in self.vocabularies.items()}
+        # Ghi nhớ chữ viết thành phần -> id để không ánh xạ lại; giới hạn như
+        # SLOT_SYMBOLS để đầu vào rác không làm bảng ghi nhớ tăng mãi
+        self._component_ids = {slot: {} for slot in SLOT_NAMES}
+        self.cache = SyllableCache(cache_size) if cache_size else None
+    
+    def _component_id(self, slot: str, key, phoneme_of) -> int:
+        ids = self._component_ids[slot]
+        component_id = ids.get(key)
+        if component_id is None:
+            component_id = self._vocab_ids[slot].get(phoneme_of(), UNKNOWN_ID)
+            if len(ids) < MAX_SLOT_SYMBOLS:
+                ids[key] = component_id
+        return component_id
+    
+    def encode_syllable(self, syllable: str) -> Tuple[int, int, int, int, int]:
+        """
+        Mã hóa một âm tiết thành 5 id (initial, medial, nucleus, final, tone)
+        
+        Thành phần có ký hiệu âm vị ngoài bộ từ vựng (nhánh fallback) nhận UNKNOWN_ID.
+        """
+        if self.cache is not None:
+            row = self.cache.get(syllable)
+            if row is not None:
+                return row
+        
+        transcriber = self.transcriber
+        analyzer = transcriber.syllable_analyzer
+        tone_code, clean_syllable = analyzer.tone_handler.split_tone(to_nfc(syllable))
+        initial, medial, nucleus, final = analyzer.parse(clean_syllable)
+        row = (
+            self._component_id('initial', initial, lambda: transcriber._map_initial(initial)),
+            self._component_id('medial', medial, lambda: transcriber._map_medial(medial)),
+            self._component_id('nucleus', nucleus, lambda: transcriber._map_nucleus(nucleus)),
+            self._component_id('final', (final, nucleus),
+                               lambda: transcriber._map_final(final, nucleus)),
+            tone_code
+        )
+        
+        if self.cache is not None:
+            self.cache.put(syllable, row)
+        return row
+    
+    def encode(self, syllables: Iterable[str], dtype=None) -> 'np.ndarray':
+        """
+        Mã hóa danh sách hoặc luồng âm tiết thành mảng liên tục (N, 5)
+        
+        Args:
+            syllables: List hoặc iterable âm tiết
+            dtype: Kiểu số nguyên của mảng (mặc định int32)
+            
+        Returns:
+            Mảng NumPy C-contiguous, cột theo FEATURE_SLOTS
+        """
+        flat = np.fromiter(
+            (value for syllable in syllables for value in self.encode_syllable(syllable)),
+            dtype=dtype or np.int32)
+        return flat.reshape(-1, len(FEATURE_SLOTS))
+    
+    def iter_batches(self, syllables: Iterable[str], batch_size: int = 4096,
+                     dtype=None) -> Iterator['np.ndarray']:
+        """Mã hóa luồng âm tiết thành các lô (batch_size, 5) cho data loader"""
+        iterator = iter(syllables)
+        while True:
+            batch = self.encode(islice(iterator, batch_size), dtype)
+            if not len(batch):
+                return
+            yield batch
+
+
+class SyllableCache:
+    """Bộ nhớ đệm LRU có giới hạn cho kết quả phiên âm từng âm tiết"""
+    
+    def __init__(self, maxsize: int = 8192):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, syllable: str) -> Optional[Dict]:
+        """Lấy kết quả đã lưu (None nếu chưa có), cập nhật thứ tự LRU"""
+        result = self._entries.get(syllable)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(syllable)
+        self.hits += 1
+        return result
+    
+    def put(self, syllable: str, result: Dict) -> None:
+        """Lưu kết quả, loại bỏ phần tử ít dùng nhất khi vượt dung lượng"""
+        self._entries[syllable] = result
+        self._entries.move_to_end(syllable)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        """Xóa toàn bộ bộ nhớ đệm và đặt lại bộ đếm"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def info(self) -> Dict[str, int]:
+        """Thống kê hit/miss/eviction của bộ nhớ đệm"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'maxsize': self.maxsize
+        }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class VietnamesePhonemeTranscriber:
     """Lớp chính thực hiện phiên âm tiếng Việt sang ký hiệu âm vị"""
     
-    def __init__(self):
-        self.syllable_analyzer = SyllableAnalyzer()
-        self.phoneme_mapper = PhonemeMapper()
+    def __init__(self, cache_size: Optional[int] = 8192, use_table: bool = False,
+                 track_table_misses: bool = False, instrument: bool = False):
+        """
+        Args:
+            cache_size: Số âm tiết tối đa giữ trong bộ nhớ đệm LRU
+                        (0 hoặc None để tắt bộ nhớ đệm)
+            use_table: Biên dịch bảng phiên âm đóng, chỉ dùng luật cho
+                       âm tiết nằm ngoài bảng. Bảng dùng chung giữa các instance
+                       và trả về cùng một dict cho mỗi âm tiết: không được sửa
+                       đổi kết quả (sao chép nếu cần)
+            track_table_misses: Đếm số lần tra trượt bảng phiên âm
+            instrument: Đo số lần gọi và thời gian từng giai đoạn (xem stage_stats)
+        """
+        self.stats = StageStats() if instrument else None
+        self.syllable_analyzer = SyllableAnalyzer(self.stats)
+        if self.stats is not None:
+            self._map_phonemes = self.stats.timed('mapping', self._map_phonemes)
+            self._format_transcription = self.stats.timed('formatting', self._format_transcription)
+        self.phoneme_mapper = self.syllable_analyzer.phoneme_mapper
+        self.cache = SyllableCache(cache_size) if cache_size else None
+        self.compact_cache = SyllableCache(cache_size) if cache_size else None
+        self._feature_encoder = None
+        self.table = None
+        if use_table:
+            # Biên dịch bảng bằng bộ phân tích không đo để stage_stats chỉ phản ánh
+            # các lần phân tích theo luật thực sự sau khi khởi tạo
+            builder = self if self.stats is None else VietnamesePhonemeTranscriber(cache_size=0)
+            self.table = TranscriptionTable.shared(
+                builder._transcribe_syllable_uncached, track_misses=track_table_misses)
     
     def split_text_to_syllables(self, text: str) -> List[str]:
         """
@@ -350,21 +979,29 @@ class VietnamesePhonemeTranscriber:
         Returns:
             Danh sách các âm tiết
         """
-        # Xóa dấu câu và ký tự đặc biệt, giữ lại khoảng trắng
-        cleaned_text = re.sub(r'[^\w\sàáảãạăắằẳẵặâấầẩẫậèéẻẽẹêếềểễệìíỉĩịòóỏõọôốồổỗộơớờởỡợùúủũụưứừửữựỳýỷỹỵ]', '', text)
-        
-        # Tách thành từ
-        words = cleaned_text.split()
-        
         syllables = []
-        for word in words:
-            # Mỗi từ trong tiếng Việt có thể là một hoặc nhiều âm tiết
-            # Với đơn giản hóa, mỗi từ được coi là một âm tiết
-            if word.strip():
-                syllables.append(word.strip())
-        
+        append = syllables.append
+        for word in to_nfc(text).split():
+            if word.isalnum():
+                append(word)
+            else:
+                # Hiếm: gạch nối, dấu câu hoặc dấu tổ hợp lẻ trong từ
+                syllables.extend(syllable if syllable.isalnum() else _INNER_PUNCT_RE.sub('', syllable)
+                                 for syllable in _SYLLABLE_RE.findall(word))
         return syllables
     
+    def iter_syllables(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """
+        Tách văn bản thành âm tiết kèm vị trí trong văn bản gốc
+        
+        Args:
+            text: Văn bản tiếng Việt
+            
+        Yields:
+            (âm tiết, start, end) với text[start:end] là đoạn gốc của âm tiết
+        """
+        return tokenize(text)
+    
     def transcribe_syllable(self, syllable: str) -> Dict[str, str]:
         """
         Phiên âm một âm tiết sang ký hiệu âm vị
@@ -373,37 +1010,142 @@ class VietnamesePhonemeTranscriber:
             syllable: Âm tiết tiếng Việt
             
         Returns:
-            Dictionary chứa thông tin phiên âm
+            Dictionary chứa thông tin phiên âm ('original' ở dạng NFC). Khi bật bộ
+            nhớ đệm hoặc bảng phiên âm, các lần gọi lặp lại (và với bảng, cả các
+            instance khác) trả về cùng một đối tượng nên không được sửa đổi kết quả.
         """
-        # Phân tích âm tiết
-        components = self.syllable_analyzer.split_syllable(syllable)
+        if self.table is not None:
+            result = self.table.get(syllable)
+            if result is not None:
+                return result
         
-        # Ánh xạ sang ký hiệu âm vị
-        phoneme_transcription = {
-            'original': syllable,
-            'components': components,
-            'phonemes': {
-                'initial': self._map_initial(components['initial']),
-                'medial': self._map_medial(components['medial']),
-                'nucleus': self._map_nucleus(components['nucleus']),
-                'final': self._map_final(components['final'], components['nucleus']),
-                'tone': components['tone']
-            }
-        }
+        if self.cache is None:
+            return self._transcribe_syllable_uncached(syllable)
         
-        # Tạo chuỗi phiên âm hoàn chỉnh
-        phoneme_string = ''
-        phoneme_string += phoneme_transcription['phonemes']['initial']
-        if phoneme_transcription['phonemes']['medial'] != '/zero/':
-            phoneme_string += phoneme_transcription['phonemes']['medial']
-        phoneme_string += phoneme_transcription['phonemes']['nucleus']
-        if phoneme_transcription['phonemes']['final'] != '/zero/':
-            phoneme_string += phoneme_transcription['phonemes']['final']
-        phoneme_string += ' ' + components['tone']
+        result = self.cache.get(syllable)
+        if result is None:
+            result = self._transcribe_syllable_uncached(syllable)
+            self.cache.put(syllable, result)
+        return result
+    
+    def transcribe_syllable_compact(self, syllable: str) -> CompactTranscription:
+        """
+        Phiên âm một âm tiết sang dạng gọn (id số nguyên, chuỗi dựng khi cần)
+        
+        Args:
+            syllable: Âm tiết tiếng Việt
+            
+        Returns:
+            CompactTranscription bất biến; các lần gọi lặp lại dùng chung đối tượng
+        """
+        if self.compact_cache is None:
+            return self._transcribe_compact_uncached(syllable)
+        
+        result = self.compact_cache.get(syllable)
+        if result is None:
+            result = self._transcribe_compact_uncached(syllable)
+            self.compact_cache.put(syllable, result)
+        return result
+    
+    def transcribe_text_compact(self, text: str) -> List[CompactTranscription]:
+        """Phiên âm toàn bộ văn bản sang danh sách kết quả dạng gọn"""
+        return [self.transcribe_syllable_compact(s) for s in self.split_text_to_syllables(text)]
+    
+    def _transcribe_compact_uncached(self, syllable: str) -> CompactTranscription:
+        """Phân tích và nội trú các thành phần, không dựng chuỗi hiển thị"""
+        syllable = to_nfc(syllable)
+        tone_code, clean_syllable = self.syllable_analyzer.tone_handler.split_tone(syllable)
+        initial, medial, nucleus, final = self.syllable_analyzer.parse(clean_syllable)
+        return CompactTranscription(
+            syllable,
+            SLOT_SYMBOLS['initial'].intern((initial, self._map_initial(initial))),
+            SLOT_SYMBOLS['medial'].intern((medial, self._map_medial(medial))),
+            SLOT_SYMBOLS['nucleus'].intern((nucleus, self._map_nucleus(nucleus))),
+            SLOT_SYMBOLS['final'].intern((final, self._map_final(final, nucleus))),
+            tone_code
+        )
+    
+    def feature_encoder(self) -> FeatureEncoder:
+        """Bộ mã hóa đặc trưng NumPy dùng chung của bộ phiên âm (cần numpy)"""
+        if self._feature_encoder is None:
+            self._feature_encoder = FeatureEncoder(
+                self, self.cache.maxsize if self.cache is not None else 0)
+        return self._feature_encoder
+    
+    def encode_features(self, syllables: Iterable[str]) -> 'np.ndarray':
+        """
+        Mã hóa âm tiết thành mảng NumPy (N, 5) id phân loại
         
-        phoneme_transcription['full_transcription'] = phoneme_string
+        Args:
+            syllables: List hoặc iterable âm tiết
+            
+        Returns:
+            Mảng int32 với các cột FEATURE_SLOTS; UNKNOWN_ID cho thành phần lạ.
+            Bộ từ vựng tương ứng ở feature_encoder().vocabularies
+        """
+        return self.feature_encoder().encode(syllables)
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Thống kê bộ nhớ đệm âm tiết (rỗng nếu đã tắt)"""
+        return self.cache.info() if self.cache is not None else {}
+    
+    def table_info(self) -> Dict[str, float]:
+        """Thống kê bảng phiên âm đóng (rỗng nếu không dùng bảng)"""
+        return self.table.info() if self.table is not None else {}
+    
+    def clear_cache(self) -> None:
+        """Xóa bộ nhớ đệm âm tiết"""
+        if self.cache is not None:
+            self.cache.clear()
+        if self.compact_cache is not None:
+            self.compact_cache.clear()
+    
+    def stage_stats(self) -> Dict[str, Dict]:
+        """
+        Số liệu đo theo giai đoạn (rỗng nếu không bật instrument)
         
-        return phoneme_transcription
+        Chỉ tính các lần phân tích theo luật; lần trúng bộ nhớ đệm/bảng không qua các giai đoạn.
+        """
+        return self.stats.snapshot() if self.stats is not None else {}
+    
+    def reset_stage_stats(self) -> None:
+        """Đặt lại số liệu đo theo giai đoạn"""
+        if self.stats is not None:
+            self.stats.reset()
+    
+    def _transcribe_syllable_uncached(self, syllable: str) -> Dict[str, str]:
+        """Phiên âm một âm tiết theo luật, không qua bộ nhớ đệm"""
+        # Chuẩn hóa NFC (âm tiết sạch đi đường nhanh), rồi phân tích âm tiết
+        syllable = to_nfc(syllable)
+        components = self.syllable_analyzer.split_syllable(syllable)
+        phonemes = self._map_phonemes(components)
+        return {
+            'original': syllable,
+            'components': components,
+            'phonemes': phonemes,
+            'full_transcription': self._format_transcription(phonemes)
+        }
+    
+    def _map_phonemes(self, components: Dict[str, str]) -> Dict[str, str]:
+        """Ánh xạ các thành phần sang ký hiệu âm vị"""
+        return {
+            'initial': self._map_initial(components['initial']),
+            'medial': self._map_medial(components['medial']),
+            'nucleus': self._map_nucleus(components['nucleus']),
+            'final': self._map_final(components['final'], components['nucleus']),
+            'tone': components['tone']
+        }
+    
+    @staticmethod
+    def _format_transcription(phonemes: Dict[str, str]) -> str:
+        """Tạo chuỗi phiên âm hoàn chỉnh (bỏ âm đệm/âm cuối /zero/)"""
+        phoneme_string = phonemes['initial']
+        if phonemes['medial'] != '/zero/':
+            phoneme_string += phonemes['medial']
+        phoneme_string += phonemes['nucleus']
+        if phonemes['final'] != '/zero/':
+            phoneme_string += phonemes['final']
+        return phoneme_string + ' ' + phonemes['tone']
     
     def _map_initial(self, initial: str) -> str:
         """Ánh xạ âm đầu sang ký hiệu âm vị"""
@@ -414,6 +1156,8 @@ class VietnamesePhonemeTranscriber:
         elif initial in self.phoneme_mapper.initial_consonants:
             return self.phoneme_mapper.initial_consonants[initial]
         else:
+            if self.stats is not None:
+                self.stats.count_fallback('initial')
             return f"/{initial}-/"  # Fallback
     
     def _map_medial(self, medial: str) -> str:
@@ -423,6 +1167,8 @@ class VietnamesePhonemeTranscriber:
         elif medial in ['u', 'o']:
             return self.phoneme_mapper.medial_consonants['w']
         else:
+            if self.stats is not None:
+                self.stats.count_fallback('medial')
             return self.phoneme_mapper.medial_consonants['']
     
     def _map_nucleus(self, nucleus: str) -> str:
@@ -436,6 +1182,8 @@ class VietnamesePhonemeTranscriber:
             elif nucleus in ['o']:
                 return '/-ɔ-/'
             else:
+                if self.stats is not None:
+                    self.stats.count_fallback('nucleus')
                 return f"/-{nucleus}-/"  # Fallback
     
     def _map_final(self, final: str, nucleus: str) -> str:
@@ -445,6 +1193,8 @@ class VietnamesePhonemeTranscriber:
         elif final in self.phoneme_mapper.final_consonants:
             return self.phoneme_mapper.final_consonants[final]
         else:
+            if self.stats is not None:
+                self.stats.count_fallback('final')
             return f"/-{final}/"  # Fallback
     
     def transcribe_text(self, text: str) -> List[Dict[str, str]]:
@@ -465,10 +1215,388 @@ class VietnamesePhonemeTranscriber:
             results.append(transcription)
         
         return results
+    
+    def transcribe_stream(self, lines: Iterable[str], by_line: bool = False,
+                          start_line: int = 1) -> Iterator[Tuple]:
+        """
+        Phiên âm lười từng dòng của file hoặc iterable, bộ nhớ không phụ thuộc
+        kích thước đầu vào
+        
+        Args:
+            lines: File đã mở hoặc iterable bất kỳ trả về từng dòng
+            by_line: True để trả về kết quả theo dòng thay vì theo âm tiết
+            start_line: Số dòng (tính từ 1) bắt đầu xử lý, dùng để tiếp tục
+                        từ checkpoint; các dòng trước đó bị bỏ qua
+            
+        Yields:
+            (số dòng, vị trí âm tiết trong dòng, kết quả) khi by_line=False,
+            (số dòng, danh sách kết quả của dòng) khi by_line=True
+        """
+        for line_number, line in enumerate(lines, 1):
+            if line_number < start_line:
+                continue
+            syllables = self.split_text_to_syllables(line)
+            if by_line:
+                yield line_number, [self.transcribe_syllable(s) for s in syllables]
+            else:
+                for position, syllable in enumerate(syllables):
+                    yield line_number, position, self.transcribe_syllable(syllable)
+
+
+class DocumentChange(NamedTuple):
+    """
+    Thay đổi sau một lần sửa văn bản: các âm tiết [index, index + removed) cũ
+    được thay bằng added, mỗi phần tử là (âm tiết, start, end, kết quả phiên âm)
+    """
+    index: int
+    removed: int
+    added: List[Tuple[str, int, int, Dict]]
 
 
-def main():
-    """Hàm main để test chương trình"""
+class IncrementalDocument:
+    """
+    Văn bản phiên âm tăng dần cho trình soạn thảo: mỗi lần sửa chỉ tách và
+    phiên âm lại các âm tiết bị ảnh hưởng
+    
+    Âm tiết được lưu theo khối BLOCK_SIZE phần tử với vị trí tương đối so với
+    gốc của khối, nên một lần sửa chỉ dịch gốc của các khối phía sau thay vì
+    cập nhật vị trí của mọi âm tiết.
+    """
+    
+    BLOCK_SIZE = 128
+    
+    def __init__(self, transcriber: 'VietnamesePhonemeTranscriber', text: str = ''):
+        self.transcriber = transcriber
+        self.text = text
+        self._bases = []
+        self._blocks = []
+        self._rebuild_blocks(0, 0, self._transcribe_tokens(tokenize(text), 0))
+    
+    def _transcribe_tokens(self, tokens: Iterable[Tuple[str, int, int]],
+                           shift: int) -> List[Tuple[str, int, int, Dict]]:
+        transcribe = self.transcriber.transcribe_syllable
+        return [(syllable, start + shift, end + shift, transcribe(syllable))
+                for syllable, start, end in tokens]
+    
+    def _rebuild_blocks(self, first: int, last: int,
+                        tokens: List[Tuple[str, int, int, Dict]]) -> None:
+        """Thay các khối [first, last) bằng tokens (vị trí tuyệt đối), chia lại khối"""
+        bases = []
+        blocks = []
+        for i in range(0, len(tokens), self.BLOCK_SIZE):
+            chunk = tokens[i:i + self.BLOCK_SIZE]
+            base = chunk[0][1]
+            bases.append(base)
+            blocks.append([(s, start - base, end - base, r) for s, start, end, r in chunk])
+        self._bases[first:last] = bases
+        self._blocks[first:last] = blocks
+    
+    def _flatten(self, first: int, last: int) -> List[Tuple[str, int, int, Dict]]:
+        """Các âm tiết của khối [first, last) với vị trí tuyệt đối"""
+        tokens = []
+        for base, block in zip(self._bases[first:last], self._blocks[first:last]):
+            tokens.extend((s, start + base, end + base, r) for s, start, end, r in block)
+        return tokens
+    
+    def replace(self, offset: int, length: int, text: str) -> DocumentChange:
+        """
+        Thay đoạn [offset, offset + length) bằng text và phiên âm lại phần bị ảnh hưởng
+        
+        Args:
+            offset: Vị trí ký tự bắt đầu
+            length: Số ký tự bị xóa
+            text: Chuỗi chèn vào
+            
+        Returns:
+            DocumentChange mô tả các âm tiết đã thay đổi
+        """
+        if not 0 <= offset <= offset + length <= len(self.text):
+            raise IndexError("Vị trí sửa nằm ngoài văn bản")
+        
+        edit_end = offset + length
+        delta = len(text) - length
+        self.text = self.text[:offset] + text + self.text[edit_end:]
+        
+        # Chọn các khối chứa âm tiết chạm vùng sửa, thêm một khối mỗi bên để có
+        # âm tiết láng giềng (sửa có thể nối hoặc tách âm tiết hai bên)
+        first = max(0, bisect_right(self._bases, offset) - 2)
+        last = min(len(self._blocks), bisect_right(self._bases, edit_end) + 1)
+        first_index = sum(map(len, self._blocks[:first]))
+        tokens = self._flatten(first, last)
+        
+        # Âm tiết chạm vùng sửa [i0, i1) cùng một láng giềng mỗi bên
+        i0 = 0
+        while i0 < len(tokens) and tokens[i0][2] < offset:
+            i0 += 1
+        i1 = i0
+        while i1 < len(tokens) and tokens[i1][1] <= edit_end:
+            i1 += 1
+        i0 = max(0, i0 - 1)
+        i1 = min(len(tokens), i1 + 1)
+        
+        window_start = min(tokens[i0][1], offset) if i0 < i1 else offset
+        window_end = max(tokens[i1 - 1][2], edit_end) if i0 < i1 else edit_end
+        
+        # Mở rộng mép phải (tọa độ văn bản mới) qua hết đoạn không có khoảng trắng:
+        # dấu tổ hợp đứng lẻ sau vùng sửa không phải âm tiết nhưng có thể gắn vào
+        # âm tiết vừa sửa (vd. xóa rồi chèn nguyên âm trước U+0301)
+        window_end += delta
+        while window_end < len(self.text) and not self.text[window_end].isspace():
+            window_end += 1
+        while True:
+            while i1 < len(tokens) and tokens[i1][1] + delta < window_end:
+                i1 += 1
+            if i1 < len(tokens) or last == len(self._blocks):
+                break
+            # Đoạn mở rộng chạm khối kế tiếp: nạp thêm khối đó vào vùng chia lại
+            tokens.extend(self._flatten(last, last + 1))
+            last += 1
+        window = self.text[window_start:window_end]
+        new_tokens = self._transcribe_tokens(tokenize(window), window_start)
+        
+        old_tokens = tokens[i0:i1]
+        tail = [(s, start + delta, end + delta, r) for s, start, end, r in tokens[i1:]]
+        # Khối phía sau chỉ cần dịch gốc; các khối bị ảnh hưởng được chia lại
+        for b in range(last, len(self._bases)):
+            self._bases[b] += delta
+        self._rebuild_blocks(first, last, tokens[:i0] + new_tokens + tail)
+        
+        # Bỏ phần đầu/cuối không đổi để trả về phạm vi thay đổi nhỏ nhất
+        head = 0
+        while head < min(len(old_tokens), len(new_tokens)) and \
+                old_tokens[head][:3] == new_tokens[head][:3]:
+            head += 1
+        trail = 0
+        while trail < min(len(old_tokens), len(new_tokens)) - head and \
+                old_tokens[-1 - trail][0] == new_tokens[-1 - trail][0] and \
+                old_tokens[-1 - trail][1] + delta == new_tokens[-1 - trail][1] and \
+                old_tokens[-1 - trail][2] + delta == new_tokens[-1 - trail][2]:
+            trail += 1
+        return DocumentChange(first_index + i0 + head,
+                              len(old_tokens) - head - trail,
+                              new_tokens[head:len(new_tokens) - trail])
+    
+    def insert(self, offset: int, text: str) -> DocumentChange:
+        """Chèn text tại offset"""
+        return self.replace(offset, 0, text)
+    
+    def delete(self, offset: int, length: int) -> DocumentChange:
+        """Xóa length ký tự bắt đầu từ offset"""
+        return self.replace(offset, length, '')
+    
+    def syllables(self) -> List[Tuple[str, int, int]]:
+        """Danh sách (âm tiết, start, end) hiện tại"""
+        return [(s, start, end) for s, start, end, _ in self._flatten(0, len(self._blocks))]
+    
+    def results(self) -> List[Dict]:
+        """Kết quả phiên âm hiện tại, theo thứ tự âm tiết"""
+        return [r for block in self._blocks for _, _, _, r in block]
+    
+    def __len__(self) -> int:
+        return sum(len(block) for block in self._blocks)
+
+
+# Các trường có thể xuất ở chế độ JSONL/TSV
+OUTPUT_FIELDS = ('line', 'position', 'syllable', 'initial', 'medial', 'nucleus', 'final',
+                 'tone', 'initial_ipa', 'medial_ipa', 'nucleus_ipa', 'final_ipa',
+                 'tone_ipa', 'transcription')
+DEFAULT_FIELDS = ('line', 'position', 'syllable', 'transcription')
+OUTPUT_FORMATS = ('text', 'jsonl', 'tsv')
+
+
+class RecordFormatter:
+    """Định dạng kết quả thành bản ghi JSONL/TSV (mỗi âm tiết một dòng), chỉ dựng các trường được chọn"""
+    
+    _RENDERERS = {
+        'syllable': lambda c: c.original,
+        'initial': lambda c: SLOT_SYMBOLS['initial'][c.initial][0],
+        'medial': lambda c: SLOT_SYMBOLS['medial'][c.medial][0],
+        'nucleus': lambda c: SLOT_SYMBOLS['nucleus'][c.nucleus][0],
+        'final': lambda c: SLOT_SYMBOLS['final'][c.final][0],
+        'tone': lambda c: TONE_NAMES[c.tone],
+        'initial_ipa': lambda c: SLOT_SYMBOLS['initial'][c.initial][1],
+        'medial_ipa': lambda c: SLOT_SYMBOLS['medial'][c.medial][1],
+        'nucleus_ipa': lambda c: SLOT_SYMBOLS['nucleus'][c.nucleus][1],
+        'final_ipa': lambda c: SLOT_SYMBOLS['final'][c.final][1],
+        'tone_ipa': lambda c: TONE_SYMBOLS[c.tone],
+        'transcription': lambda c: c.full_transcription
+    }
+    
+    def __init__(self, transcriber: 'VietnamesePhonemeTranscriber', fmt: str = 'jsonl',
+                 fields: Iterable[str] = DEFAULT_FIELDS):
+        """
+        Args:
+            transcriber: Bộ phiên âm
+            fmt: 'jsonl' hoặc 'tsv'
+            fields: Các trường cần xuất; line và position luôn đứng đầu nếu được chọn
+        """
+        fields = list(fields)
+        unknown = [f for f in fields if f not in OUTPUT_FIELDS]
+        if unknown:
+            raise ValueError(f"Trường không hợp lệ: {', '.join(unknown)}")
+        if fmt not in ('jsonl', 'tsv'):
+            raise ValueError(f"Định dạng không hợp lệ: {fmt}")
+        
+        self.transcriber = transcriber
+        self.fmt = fmt
+        self.with_line = 'line' in fields
+        self.with_position = 'position' in fields
+        self.syllable_fields = [f for f in fields if f not in ('line', 'position')]
+        self.fields = (['line'] if self.with_line else []) + \
+                      (['position'] if self.with_position else []) + self.syllable_fields
+        self._renderers = [self._RENDERERS[f] for f in self.syllable_fields]
+        # Phần bản ghi phụ thuộc âm tiết được dựng một lần rồi dùng lại
+        self._tails = {}
+    
+    def header(self) -> str:
+        """Dòng tiêu đề (chỉ với TSV)"""
+        return '\t'.join(self.fields) + '\n' if self.fmt == 'tsv' else ''
+    
+    def _tail(self, syllable: str) -> str:
+        tail = self._tails.get(syllable)
+        if tail is None:
+            compact = self.transcriber.transcribe_syllable_compact(syllable)
+            values = [render(compact) for render in self._renderers]
+            if self.fmt == 'tsv':
+                tail = '\t'.join(values)
+            else:
+                tail = json.dumps(dict(zip(self.syllable_fields, values)),
+                                  ensure_ascii=False)[1:-1]
+            if len(self._tails) < 65536:
+                self._tails[syllable] = tail
+        return tail
+    
+    def format_line(self, line_number: int, text: str) -> str:
+        """Các bản ghi của một dòng đầu vào (mỗi bản ghi kết thúc bằng xuống dòng)"""
+        records = []
+        tsv = self.fmt == 'tsv'
+        for position, syllable in enumerate(self.transcriber.split_text_to_syllables(text)):
+            parts = []
+            if self.with_line:
+                parts.append(str(line_number) if tsv else f'"line": {line_number}')
+            if self.with_position:
+                parts.append(str(position) if tsv else f'"position": {position}')
+            if self._renderers:
+                parts.append(self._tail(syllable))
+            records.append('\t'.join(parts) if tsv else '{' + ', '.join(parts) + '}')
+        return ''.join(record + '\n' for record in records)
+
+
+# Bộ phiên âm và bộ định dạng riêng của từng tiến trình con (khởi tạo một lần mỗi tiến trình)
+_worker_transcriber = None
+_worker_formatter = None
+
+
+def _init_worker(fmt: str = 'text', fields: Iterable[str] = DEFAULT_FIELDS) -> None:
+    """Khởi tạo bộ phiên âm trong tiến trình con"""
+    global _worker_transcriber, _worker_formatter
+    _worker_transcriber = VietnamesePhonemeTranscriber()
+    _worker_formatter = None
+    if fmt != 'text':
+        _worker_formatter = RecordFormatter(_worker_transcriber, fmt, fields)
+
+
+def _transcribe_chunk(start_line: int, lines: List[str]) -> str:
+    """
+    Phiên âm một khối dòng bắt đầu ở dòng start_line
+    
+    Định dạng text: mỗi dòng đầu vào cho đúng một dòng đầu ra;
+    JSONL/TSV: mỗi âm tiết một bản ghi
+    """
+    if _worker_transcriber is None:
+        _init_worker()
+    if _worker_formatter is not None:
+        return ''.join(_worker_formatter.format_line(n, line)
+                       for n, line in enumerate(lines, start_line))
+    
+    output = []
+    for line in lines:
+        results = _worker_transcriber.transcribe_text(line)
+        output.append(' | '.join(r['full_transcription'] for r in results) + '\n')
+    return ''.join(output)
+
+
+def read_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[Tuple[int, List[str]]]:
+    """Chia iterable dòng thành các khối chunk_size dòng kèm số dòng bắt đầu"""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size phải >= 1, nhận {chunk_size}")
+    iterator = iter(lines)
+    start_line = 1
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start_line, chunk
+        start_line += len(chunk)
+
+
+def _open_text(path: str, mode: str):
+    """Mở file UTF-8; '-' là stdin/stdout (không đóng khi thoát)"""
+    if path == '-':
+        stream = sys.stdin if 'r' in mode else sys.stdout
+        return open(stream.fileno(), mode, encoding='utf-8', buffering=1 << 20,
+                    closefd=False)
+    return open(path, mode, encoding='utf-8', buffering=1 << 20)
+
+
+def transcribe_file(input_path: str, output_path: str, workers: int = 0,
+                    chunk_size: int = 1000, fmt: str = 'text',
+                    fields: Iterable[str] = DEFAULT_FIELDS) -> int:
+    """
+    Phiên âm file lớn song song trên nhiều tiến trình, giữ nguyên thứ tự dòng
+    
+    Số khối đang xử lý được giới hạn ở 2 × workers nên bộ nhớ không phụ thuộc
+    kích thước file. Mỗi khối được ghi ra bằng một lần write.
+    
+    Args:
+        input_path: File văn bản đầu vào (UTF-8), '-' để đọc stdin
+        output_path: File kết quả, '-' để ghi stdout
+        workers: Số tiến trình (0 = số CPU, 1 = chạy tuần tự)
+        chunk_size: Số dòng mỗi khối gửi cho tiến trình con
+        fmt: 'text' (một dòng kết quả cho mỗi dòng vào), 'jsonl' hoặc 'tsv'
+        fields: Các trường xuất ra với JSONL/TSV
+        
+    Returns:
+        Số dòng đã xử lý
+    """
+    fields = tuple(fields)
+    workers = workers or os.cpu_count() or 1
+    processed = 0
+    
+    with _open_text(input_path, 'r') as fin, _open_text(output_path, 'w') as fout:
+        chunks = read_chunks(fin, chunk_size)
+        if fmt != 'text':
+            fout.write(RecordFormatter(None, fmt, fields).header())
+        
+        if workers == 1:
+            _init_worker(fmt, fields)
+            for start_line, chunk in chunks:
+                fout.write(_transcribe_chunk(start_line, chunk))
+                processed += len(chunk)
+            return processed
+        
+        # Nhập multiprocessing khi thật sự cần để giữ thời gian import main thấp
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(fmt, fields)) as pool:
+            pending = deque()
+            for start_line, chunk in chunks:
+                pending.append((pool.submit(_transcribe_chunk, start_line, chunk), len(chunk)))
+                # Ghi kết quả theo thứ tự nộp, giới hạn số khối đang chờ
+                while len(pending) >= 2 * workers:
+                    future, count = pending.popleft()
+                    fout.write(future.result())
+                    processed += count
+            while pending:
+                future, count = pending.popleft()
+                fout.write(future.result())
+                processed += count
+    
+    return processed
+
+
+def interactive() -> None:
+    """Vòng lặp nhập văn bản và in kết quả phiên âm chi tiết"""
     transcriber = VietnamesePhonemeTranscriber()
     
     print("=== CHƯƠNG TRÌNH PHIÊN ÂM ÂM VỊ HỌC TIẾNG VIỆT ===")
@@ -495,5 +1623,65 @@ def main():
             print(f"  - Phiên âm: {result['full_transcription']}")
 
 
+def _int_at_least(value: str, minimum: int) -> int:
+    import argparse
+    number = int(value)
+    if number < minimum:
+        raise argparse.ArgumentTypeError(f"phải >= {minimum}, nhận {number}")
+    return number
+
+
+def positive_int(value: str) -> int:
+    """Kiểu argparse cho số nguyên >= 1 (vd. --chunk-size)"""
+    return _int_at_least(value, 1)
+
+
+def non_negative_int(value: str) -> int:
+    """Kiểu argparse cho số nguyên >= 0 (vd. --workers, 0 mang nghĩa mặc định)"""
+    return _int_at_least(value, 0)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Hàm main: chế độ tương tác, phiên âm file theo lô hoặc xuất JSONL/TSV cho pipeline"""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Phiên âm âm vị học tiếng Việt")
+    parser.add_argument('-i', '--input',
+                        help="File đầu vào để phiên âm theo lô ('-' để đọc stdin)")
+    parser.add_argument('-o', '--output',
+                        help="File kết quả ('-' là stdout; mặc định: <input>.phonemes.txt, "
+                             "hoặc stdout khi đọc stdin)")
+    parser.add_argument('-w', '--workers', type=non_negative_int, default=0,
+                        help="Số tiến trình (0 = số CPU)")
+    parser.add_argument('--chunk-size', type=positive_int, default=1000,
+                        help="Số dòng mỗi khối")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS,
+                        help="Định dạng đầu ra; jsonl/tsv cho một bản ghi mỗi âm tiết "
+                             "(mặc định đọc stdin nếu không có --input)")
+    parser.add_argument('--fields', default=','.join(DEFAULT_FIELDS),
+                        help="Các trường xuất với jsonl/tsv, phân tách bằng dấu phẩy: "
+                             + ', '.join(OUTPUT_FIELDS))
+    args = parser.parse_args(argv)
+    
+    if not args.input and not args.format:
+        interactive()
+        return
+    
+    fields = [f.strip() for f in args.fields.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in OUTPUT_FIELDS]
+    if unknown:
+        parser.error(f"trường không hợp lệ: {', '.join(unknown)}")
+    
+    source = args.input or '-'
+    if args.output:
+        output = args.output
+    else:
+        output = '-' if source == '-' else source + '.phonemes.txt'
+    processed = transcribe_file(source, output, args.workers, args.chunk_size,
+                                args.format or 'text', fields)
+    if output != '-':
+        print(f"Đã phiên âm {processed} dòng -> {output}", file=sys.stderr)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chỉ mục ngược từ âm vị về chữ viết: tìm mọi âm tiết cho ra một mẫu phiên âm
+(vd. âm chính /-ie-/, âm cuối /-ŋ/, thanh ngã) bằng giao các danh sách id
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main as rules
+from main import (GROUNDTRUTH_FILE, TONE_LABELS, TONE_NAMES, VietnamesePhonemeTranscriber,
+                  load_syllables)
+
+# Chỉ mục dựng sẵn từ groundtruth (tạo lại khi danh sách nguồn mới hơn)
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'phoneme_index.json')
+
+# Khóa chỉ mục: các thành phần của PhonemeMapper và thanh điệu (theo tên)
+INDEX_SLOTS = ('initial', 'medial', 'nucleus', 'final', 'tone')
+
+# Dạng ký hiệu theo thành phần, để chấp nhận truy vấn viết tắt (vd. "ie" -> "/-ie-/")
+_SYMBOL_FORMATS = {'initial': '/{}-/', 'medial': '/-{}-/', 'nucleus': '/-{}-/', 'final': '/-{}/'}
+
+INDEX_VERSION = 1
+
+
+def rules_fingerprint() -> str:
+    """Băm mã nguồn luật phiên âm (main.py): chỉ mục dựng với luật khác bị coi là cũ"""
+    with open(rules.__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class PhonemeIndex:
+    """Danh sách id âm tiết (đã sắp xếp) theo từng ký hiệu âm vị của mỗi thành phần"""
+
+    def __init__(self, syllables: List[str], postings: Dict[str, Dict[str, List[int]]]):
+        """
+        Args:
+            syllables: Danh sách âm tiết, id là vị trí trong danh sách
+            postings: thành phần -> ký hiệu -> danh sách id tăng dần
+        """
+        self.syllables = syllables
+        self.postings = postings
+        # Tập id dựng một lần để kiểm tra thành viên khi giao
+        self._sets: Dict[str, Dict[str, FrozenSet[int]]] = {
+            slot: {symbol: frozenset(ids) for symbol, ids in by_symbol.items()}
+            for slot, by_symbol in postings.items()
+        }
+
+    @classmethod
+    def build(cls, syllables: Iterable[str],
+              transcriber: Optional[VietnamesePhonemeTranscriber] = None) -> 'PhonemeIndex':
+        """
+        Phiên âm một lần toàn bộ danh sách và dựng chỉ mục
+
+        Args:
+            syllables: Các âm tiết (trùng lặp bị bỏ qua)
+            transcriber: Bộ phiên âm dùng để dựng (mặc định tạo mới)
+        """
+        transcriber = transcriber or VietnamesePhonemeTranscriber(cache_size=0)
+        unique = sorted(set(syllables))
+        postings = {slot: {} for slot in INDEX_SLOTS}
+        for syllable_id, syllable in enumerate(unique):
+            phonemes = transcriber.transcribe_syllable(syllable)['phonemes']
+            for slot in INDEX_SLOTS:
+                symbol = phonemes[slot]
+                if slot == 'tone':
+                    symbol = TONE_NAMES[TONE_LABELS.index(symbol)]
+                postings[slot].setdefault(symbol, []).append(syllable_id)
+        return cls(unique, postings)
+
+    @staticmethod
+    def normalize_key(slot: str, value) -> str:
+        """Chuẩn hóa giá trị truy vấn: ký hiệu đầy đủ, viết tắt, tên/nhãn/mã thanh"""
+        if slot == 'tone':
+            if isinstance(value, str) and value.isdigit():
+                # Mã thanh từ dòng lệnh đến dưới dạng chuỗi (vd. --tone 4)
+                value = int(value)
+            if isinstance(value, int):
+                return TONE_NAMES[value]
+            if value in TONE_LABELS:
+                return TONE_NAMES[TONE_LABELS.index(value)]
+            return value
+        if value == 'zero':
+            return '/zero/'
+        if value.startswith('/'):
+            return value
+        return _SYMBOL_FORMATS[slot].format(value)
+
+    def query(self, **keys) -> List[str]:
+        """
+        Mọi âm tiết khớp đồng thời tất cả khóa đã cho
+
+        Args:
+            **keys: initial, medial, nucleus, final, tone (thiếu khóa = không ràng buộc)
+
+        Returns:
+            Danh sách âm tiết theo thứ tự chỉ mục
+        """
+        unknown = set(keys) - set(INDEX_SLOTS)
+        if unknown:
+            raise ValueError(f"unknown index keys: {', '.join(sorted(unknown))}")
+        terms = [(slot, self.normalize_key(slot, value)) for slot, value in keys.items()
+                 if value is not None]
+        if not terms:
+            return list(self.syllables)
+
+        empty: List[int] = []
+        lists = [self.postings[slot].get(symbol, empty) for slot, symbol in terms]
+        # Duyệt danh sách ngắn nhất, kiểm tra thành viên trong các tập còn lại
+        order = sorted(range(len(terms)), key=lambda i: len(lists[i]))
+        shortest = lists[order[0]]
+        others = [self._sets[terms[i][0]].get(terms[i][1], frozenset()) for i in order[1:]]
+        return [self.syllables[i] for i in shortest if all(i in s for s in others)]
+
+    def symbols(self, slot: str) -> List[str]:
+        """Các ký hiệu có trong chỉ mục của một thành phần"""
+        return sorted(self.postings[slot])
+
+    def __len__(self) -> int:
+        return len(self.syllables)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'rules': rules_fingerprint(),
+                       'syllables': self.syllables,
+                       'postings': self.postings}, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'PhonemeIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError(f"unsupported phoneme index version in {path}")
+        if data.get('rules') != rules_fingerprint():
+            raise ValueError(f"phoneme index {path} was built with different transcription rules")
+        return cls(data['syllables'], data['postings'])
+
+    @classmethod
+    def load_or_build(cls, path: str = INDEX_FILE,
+                      source: str = GROUNDTRUTH_FILE) -> 'PhonemeIndex':
+        """
+        Đọc chỉ mục đã lưu; dựng lại và lưu nếu chưa có, cũ hơn file nguồn
+        hoặc được dựng với luật phiên âm khác
+        """
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+            try:
+                return cls.load(path)
+            except ValueError:
+                pass
+        index = cls.build(load_syllables(source))
+        index.save(path)
+        return index
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Chỉ mục ngược âm vị -> chữ viết")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_build = sub.add_parser('build', help="Dựng chỉ mục từ danh sách âm tiết")
+    p_build.add_argument('-o', '--output', default=INDEX_FILE)
+    p_build.add_argument('-i', '--input', default=GROUNDTRUTH_FILE)
+    p_query = sub.add_parser('query', help="Tìm âm tiết theo các thành phần âm vị")
+    p_query.add_argument('--index', default=INDEX_FILE,
+                         help="File chỉ mục (dựng từ groundtruth nếu chưa có)")
+    for slot in INDEX_SLOTS:
+        p_query.add_argument(f'--{slot}')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        index = PhonemeIndex.build(load_syllables(args.input))
+        index.save(args.output)
+        print(f"Indexed {len(index)} syllables into {args.output}")
+        return
+
+    index = PhonemeIndex.load_or_build(args.index)
+    matches = index.query(**{slot: getattr(args, slot) for slot in INDEX_SLOTS})
+    for syllable in matches:
+        print(syllable)
+    print(f"{len(matches)} syllables", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dịch vụ phiên âm asyncio (HTTP/JSON qua TCP hoặc Unix socket)
+Gom các yêu cầu đồng thời thành lô nhỏ để giảm chi phí cho mỗi lần gọi
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main import VietnamesePhonemeTranscriber
+
+# Giới hạn kích thước thân yêu cầu (byte)
+MAX_BODY_BYTES = 1 << 20
+
+# Đánh dấu thân yêu cầu có Content-Length không hợp lệ (không phải số hoặc âm)
+_BAD_LENGTH = object()
+
+
+class Overloaded(Exception):
+    """Hàng đợi đầy: từ chối yêu cầu thay vì để độ trễ tăng không giới hạn"""
+
+
+class LatencyTracker:
+    """Lưu độ trễ của các yêu cầu gần nhất và tính phân vị"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentiles(self, points: Tuple[float, ...] = (50, 90, 99)) -> Dict[str, float]:
+        """Phân vị độ trễ (mili giây) trên cửa sổ mẫu hiện tại"""
+        if not self.samples:
+            return {f"p{p:g}": 0.0 for p in points}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {f"p{p:g}": ordered[min(last, int(round(p / 100 * last)))] * 1000
+                for p in points}
+
+
+class MicroBatcher:
+    """Gom yêu cầu thành lô theo kích thước tối đa hoặc thời gian chờ tối đa"""
+
+    def __init__(self, transcriber: VietnamesePhonemeTranscriber,
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 max_pending: int = 1024):
+        """
+        Args:
+            transcriber: Bộ phiên âm dùng chung (chỉ chạy trên một luồng)
+            max_batch_size: Số yêu cầu tối đa trong một lô
+            max_wait_ms: Thời gian tối đa chờ gom thêm yêu cầu vào lô
+            max_pending: Số yêu cầu tối đa được xếp hàng trước khi từ chối
+        """
+        self.transcriber = transcriber
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending
+        self.latency = LatencyTracker()
+        self.batches = 0
+        self.batched_requests = 0
+        self.rejected = 0
+        self._queue = None
+        self._worker = None
+        # Một luồng duy nhất: bộ nhớ đệm của transcriber không an toàn đa luồng
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(self.max_pending)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, texts: List[str]) -> List[List[Dict]]:
+        """
+        Xếp một yêu cầu vào hàng đợi và chờ kết quả của lô chứa nó
+
+        Raises:
+            Overloaded: khi hàng đợi đã đầy
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        start = time.perf_counter()
+        try:
+            self._queue.put_nowait((texts, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded()
+        result = await future
+        self.latency.add(time.perf_counter() - start)
+        return result
+
+    def _transcribe_batch(self, requests: List[List[str]]) -> List[List[List[Dict]]]:
+        transcribe_text = self.transcriber.transcribe_text
+        return [[transcribe_text(text) for text in texts] for texts in requests]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self._transcribe_batch, [texts for texts, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.batches += 1
+            self.batched_requests += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict:
+        """Thống kê lô, hàng đợi và phân vị độ trễ"""
+        return {
+            'requests': self.latency.count,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'rejected': self.rejected,
+            'latency_ms': self.latency.percentiles()
+        }
+
+
+class TranscriptionServer:
+    """Máy chủ HTTP/1.1 tối giản: POST /transcribe, GET /stats, GET /health"""
+
+    def __init__(self, batcher: MicroBatcher, max_connections: int = 256):
+        self.batcher = batcher
+        self._connections = asyncio.Semaphore(max_connections)
+        self._server = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765,
+                    unix_path: Optional[str] = None) -> None:
+        await self.batcher.start()
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+
+    @property
+    def sockets(self):
+        return self._server.sockets if self._server is not None else []
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        async with self._connections:
+            try:
+                while True:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    status, payload = await self._dispatch(method, path, body)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    self._write_response(writer, status, payload, keep_alive)
+                    await writer.drain()
+                    if not keep_alive:
+                        break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            return None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Không xác định được ranh giới thân yêu cầu nên phải đóng kết nối
+            return method, path, {'connection': 'close'}, _BAD_LENGTH
+        if length > MAX_BODY_BYTES:
+            return method, path, {'connection': 'close'}, None
+        body = await reader.readexactly(length) if length else b''
+        return method, path, headers, body
+
+    async def _dispatch(self, method: str, path: str, body: Optional[bytes]):
+        if body is _BAD_LENGTH:
+            return 400, {'error': 'invalid Content-Length'}
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and path == '/stats':
+            return 200, self.batcher.stats()
+        if path != '/transcribe':
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 405, {'error': 'method not allowed'}
+        if body is None:
+            return 413, {'error': 'request body too large'}
+
+        try:
+            data = json.loads(body or b'{}')
+            texts = data['texts'] if 'texts' in data else [data['text']]
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return 400, {'error': 'expected JSON {"text": str} or {"texts": [str]}'}
+
+        try:
+            results = await self.batcher.submit(texts)
+        except Overloaded:
+            return 503, {'error': 'server overloaded, retry later'}
+        return 200, {'results': results}
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: Dict,
+                        keep_alive: bool) -> None:
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                   405: 'Method Not Allowed', 413: 'Payload Too Large',
+                   503: 'Service Unavailable'}
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+
+async def serve(args) -> None:
+    batcher = MicroBatcher(VietnamesePhonemeTranscriber(use_table=args.use_table),
+                           args.max_batch_size, args.max_wait_ms, args.max_pending)
+    server = TranscriptionServer(batcher, args.max_connections)
+    await server.start(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Serving on {where}", file=sys.stderr)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dịch vụ phiên âm tiếng Việt (asyncio)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Đường dẫn Unix socket (thay cho TCP)")
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--max-pending', type=int, default=1024,
+                        help="Số yêu cầu xếp hàng tối đa trước khi trả 503")
+    parser.add_argument('--max-connections', type=int, default=256)
+    parser.add_argument('--use-table', action='store_true',
+                        help="Dùng bảng phiên âm biên dịch sẵn")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,65 @@
 Unit tests cho chương trình phiên âm âm vị học tiếng Việt
 """
 
+import asyncio
+import contextlib
+import io
+import json
+import random
+import tempfile
+import unicodedata
 import unittest
+from unittest import mock
 import sys
 import os
 
 # Thêm đường dẫn để import module main
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import main
 from main import (
     ToneHandler, 
     PhonemeMapper, 
     SyllableAnalyzer, 
-    VietnamesePhonemeTranscriber
+    SyllableCache,
+    SymbolTable,
+    CompactTranscription,
+    TranscriptionTable,
+    VietnamesePhonemeTranscriber,
+    FEATURE_SLOTS,
+    UNKNOWN_ID,
+    ACCENT_MAP,
+    enumerate_syllables,
+    tone_positions,
+    transcribe_file,
+    tokenize,
+    to_nfc,
+    RecordFormatter,
+    IncrementalDocument
 )
 
+from server import MicroBatcher, TranscriptionServer
+from lexicon import Lexicon, build_lexicon, strip_tone
+from evaluate import evaluate, main as evaluate_main
+from phoneme_index import PhonemeIndex
+
+# Các module xử lý dữ liệu của GK2 (thêm vào cuối để không che module GK1)
+GK2_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'GK2')
+sys.path.append(GK2_DIR)
+
+import compare_syllables
+import groundtruth_not_in_vdic_script
+import extract_syllables
+import pipeline
+import sorted_merge
+from sorted_merge import external_sort, merge_diff
+from syllable_index import SyllableIndex, build_index
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestToneHandler(unittest.TestCase):
     """Test class cho ToneHandler"""
@@ -93,6 +138,24 @@ class TestToneHandler(unittest.TestCase):
         self.assertEqual(self.tone_handler.remove_tone_marks("ông"), "ong")  # ô -> o
         self.assertEqual(self.tone_handler.remove_tone_marks("ượu"), "uơu")  # ự -> u, ơ giữ nguyên, u -> u
 
+    def test_shared_tables_read_only(self):
+        """Test bảng thanh điệu dùng chung không thể bị sửa qua một ToneHandler"""
+        with self.assertRaises(TypeError):
+            self.tone_handler.tone_marks['x'] = 1
+        with self.assertRaises(TypeError):
+            self.tone_handler.tone_names[0] = 'x'
+        with self.assertRaises(TypeError):
+            self.tone_handler.tone_symbols[0] = 'x'
+        with self.assertRaises(TypeError):
+            ACCENT_MAP['x'] = 'y'
+        self.assertEqual(ToneHandler().tone_marks['à'], 1)
+
+    def test_split_tone(self):
+        """Test tách thanh điệu và dạng không dấu trong một lần gọi"""
+        self.assertEqual(self.tone_handler.split_tone("Tóc"), (2, "toc"))
+        self.assertEqual(self.tone_handler.split_tone("ượu"), (5, "uơu"))
+        self.assertEqual(self.tone_handler.split_tone("con"), (0, "con"))
+
 
 class TestSyllableAnalyzer(unittest.TestCase):
     """Test class cho SyllableAnalyzer"""
@@ -211,6 +274,15 @@ class TestSyllableAnalyzer(unittest.TestCase):
         
         result = self.analyzer.split_syllable("mạ")
         self.assertIn("nặng", result['tone'])
+    
+    def test_parse_one_pass(self):
+        """Test tách âm tiết đã bỏ dấu trong một lượt"""
+        self.assertEqual(self.analyzer.parse("nghieng"), ('ngh', '', 'ie', 'ng'))
+        self.assertEqual(self.analyzer.parse("quan"), ('qu', 'u', 'a', 'n'))
+        self.assertEqual(self.analyzer.parse("hoai"), ('h', 'o', 'a', 'i'))
+        self.assertEqual(self.analyzer.parse("kinh"), ('k', '', 'i', 'nh'))
+        self.assertEqual(self.analyzer.parse("ka"), ('', '', 'ka', ''))
+        self.assertEqual(self.analyzer.parse(""), ('', '', '', ''))
 
 
 class TestPhonemeMapper(unittest.TestCase):
@@ -219,6 +291,15 @@ class TestPhonemeMapper(unittest.TestCase):
     def setUp(self):
         self.mapper = PhonemeMapper()
     
+    def test_tables_shared_and_read_only(self):
+        """Test các bảng dùng chung giữa instance và không sửa được"""
+        other = PhonemeMapper()
+        self.assertIs(other.vowels, self.mapper.vowels)
+        self.assertIs(VietnamesePhonemeTranscriber().phoneme_mapper.final_consonants,
+                      self.mapper.final_consonants)
+        with self.assertRaises(TypeError):
+            self.mapper.initial_consonants['b'] = '/p-/'
+    
     def test_initial_consonants_mapping(self):
         """Test ánh xạ âm đầu"""
         self.assertEqual(self.mapper.initial_consonants['b'], '/b-/')
@@ -347,6 +428,65 @@ class TestVietnamesePhonemeTranscriber(unittest.TestCase):
         self.assertIn('/-i-/', transcription)
         self.assertIn('/-n/', transcription)
         self.assertIn('ngang', transcription)
+    
+    def test_split_text_offsets(self):
+        """Test tách âm tiết kèm vị trí trong văn bản gốc"""
+        text = "Xin chào, bạn!"
+        spans = list(self.transcriber.iter_syllables(text))
+        self.assertEqual(spans, [("Xin", 0, 3), ("chào", 4, 8), ("bạn", 10, 13)])
+        for syllable, start, end in spans:
+            self.assertEqual(text[start:end], syllable)
+    
+    def test_split_hyphenated_loanword(self):
+        """Test tách từ mượn có gạch nối thành từng âm tiết"""
+        self.assertEqual(self.transcriber.split_text_to_syllables("a-đrê-na-lin"),
+                         ["a", "đrê", "na", "lin"])
+        self.assertEqual(list(tokenize("...")), [])
+        self.assertEqual(list(tokenize("\"tôi\".")), [("tôi", 1, 4)])
+    
+    def test_nfd_input_normalized(self):
+        """Test văn bản NFD (macOS, một số bộ gõ) được chuẩn hóa trước khi phân tích"""
+        nfc = "Người Việt uống rượu"
+        nfd = unicodedata.normalize('NFD', nfc)
+        self.assertNotEqual(nfc, nfd)
+        self.assertEqual(self.transcriber.transcribe_text(nfd),
+                         self.transcriber.transcribe_text(nfc))
+        result = self.transcriber.transcribe_syllable(unicodedata.normalize('NFD', "rượu"))
+        self.assertIn("nặng", result['phonemes']['tone'])
+        self.assertEqual(result['original'], "rượu")
+    
+    def test_nfd_offsets_point_into_original(self):
+        """Test vị trí âm tiết của văn bản NFD trỏ vào văn bản gốc"""
+        nfd = unicodedata.normalize('NFD', "Xin chào bạn")
+        for syllable, start, end in self.transcriber.iter_syllables(nfd):
+            self.assertEqual(to_nfc(nfd[start:end]), syllable)
+        clean = "xin chào"
+        self.assertIs(to_nfc(clean), clean)  # đường nhanh: không sao chép
+    
+    def test_stray_combining_mark_dropped(self):
+        """Test dấu tổ hợp đứng lẻ không tạo ra âm tiết rỗng"""
+        text = "x \u0301 y \u0323"
+        self.assertEqual(self.transcriber.split_text_to_syllables(text), ["x", "y"])
+        self.assertEqual([s for s, _, _ in tokenize(text)], ["x", "y"])
+        self.assertEqual([r['original'] for r in self.transcriber.transcribe_text(text)],
+                         ["x", "y"])
+        self.assertEqual([s for s, _, _ in IncrementalDocument(self.transcriber, text).syllables()],
+                         ["x", "y"])
+    
+    def test_transcribe_stream_by_syllable(self):
+        """Test phiên âm lười theo âm tiết kèm số dòng"""
+        lines = io.StringIO("xin chào\n\ntôi là\n")
+        items = list(self.transcriber.transcribe_stream(lines))
+        self.assertEqual([(n, i) for n, i, _ in items], [(1, 0), (1, 1), (3, 0), (3, 1)])
+        self.assertEqual(items[1][2], self.transcriber.transcribe_syllable("chào"))
+    
+    def test_transcribe_stream_by_line_resume(self):
+        """Test phiên âm theo dòng và tiếp tục từ checkpoint"""
+        lines = ["xin chào", "tôi là", "sinh viên"]
+        items = list(self.transcriber.transcribe_stream(iter(lines), by_line=True,
+                                                        start_line=2))
+        self.assertEqual([n for n, _ in items], [2, 3])
+        self.assertEqual(items[1][1], self.transcriber.transcribe_text("sinh viên"))
 
 
 class TestSpecialCases(unittest.TestCase):
@@ -389,6 +529,860 @@ class TestSpecialCases(unittest.TestCase):
         self.assertEqual(result['phonemes']['final'], '/-k/')
 
 
+class TestSyllableCache(unittest.TestCase):
+    """Test bộ nhớ đệm LRU cho phiên âm âm tiết"""
+    
+    def test_cache_hits_and_misses(self):
+        """Test đếm hit/miss khi phiên âm lặp lại"""
+        transcriber = VietnamesePhonemeTranscriber(cache_size=16)
+        first = transcriber.transcribe_syllable("của")
+        second = transcriber.transcribe_syllable("của")
+        self.assertIs(first, second)
+        info = transcriber.cache_info()
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['size'], 1)
+    
+    def test_cache_lru_eviction(self):
+        """Test loại bỏ phần tử ít dùng nhất khi đầy"""
+        cache = SyllableCache(maxsize=2)
+        cache.put("và", {'original': "và"})
+        cache.put("là", {'original': "là"})
+        cache.get("và")
+        cache.put("của", {'original': "của"})
+        self.assertIsNone(cache.get("là"))
+        self.assertIsNotNone(cache.get("và"))
+        self.assertEqual(cache.info()['evictions'], 1)
+    
+    def test_cache_disabled(self):
+        """Test tắt bộ nhớ đệm cho kết quả giống hệt"""
+        cached = VietnamesePhonemeTranscriber()
+        uncached = VietnamesePhonemeTranscriber(cache_size=0)
+        self.assertIsNone(uncached.cache)
+        self.assertEqual(uncached.cache_info(), {})
+        for syllable in ["xin", "chào", "quán", "xin"]:
+            self.assertEqual(cached.transcribe_syllable(syllable),
+                             uncached.transcribe_syllable(syllable))
+
+
+class TestTranscriptionTable(unittest.TestCase):
+    """Test bảng phiên âm đóng biên dịch sẵn"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.rule_based = VietnamesePhonemeTranscriber(cache_size=0)
+        cls.transcriber = VietnamesePhonemeTranscriber(use_table=True,
+                                                       track_table_misses=True)
+    
+    def test_tone_positions(self):
+        """Test vị trí đặt dấu thanh trong vần"""
+        self.assertEqual(tone_positions("ươn"), [1])
+        self.assertEqual(tone_positions("ang"), [0])
+        self.assertEqual(tone_positions("ai"), [0])
+        self.assertEqual(tone_positions("oa"), [0, 1])
+        self.assertEqual(tone_positions("oai"), [1])
+    
+    def test_enumerate_syllables(self):
+        """Test liệt kê tổ hợp âm đầu × vần × thanh"""
+        syllables = set(enumerate_syllables(["a", "at", "oa"]))
+        self.assertIn("má", syllables)
+        self.assertIn("mạt", syllables)
+        self.assertNotIn("màt", syllables)  # âm tắc không mang thanh huyền
+        self.assertIn("hoà", syllables)
+        self.assertIn("hòa", syllables)
+        self.assertNotIn("ka", syllables)
+    
+    def test_table_shared_between_instances(self):
+        """Test bảng biên dịch một lần, bộ đếm trúng/trượt riêng từng instance"""
+        other = VietnamesePhonemeTranscriber(use_table=True)
+        self.assertIs(other.table.entries, self.transcriber.table.entries)
+        other.transcribe_syllable("xin")
+        self.assertEqual(other.table.hits, 0)
+        self.assertFalse(other.table.track_misses)
+    
+    def test_table_matches_rules(self):
+        """Test bảng cho kết quả giống hệt phân tích theo luật"""
+        for syllable in ["xin", "chào", "quán", "nghiêng", "khuỷu", "hoà"]:
+            self.assertIn(syllable, self.transcriber.table)
+            self.assertEqual(self.transcriber.transcribe_syllable(syllable),
+                             self.rule_based.transcribe_syllable(syllable))
+    
+    def test_table_miss_fallback(self):
+        """Test âm tiết ngoài bảng dùng luật và được đếm"""
+        before = self.transcriber.table_info()['misses']
+        result = self.transcriber.transcribe_syllable("Xin")
+        self.assertEqual(result, self.rule_based.transcribe_syllable("Xin"))
+        self.assertEqual(self.transcriber.table_info()['misses'], before + 1)
+    
+    def test_table_is_frozen(self):
+        """Test bảng chỉ đọc"""
+        table = TranscriptionTable({"a": {}})
+        with self.assertRaises(TypeError):
+            table.entries["b"] = {}
+
+
+class TestBatchTranscription(unittest.TestCase):
+    """Test phiên âm file theo lô trên nhiều tiến trình"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmpdir.name, "input.txt")
+        lines = ["xin chào", "", "tôi là sinh viên", "quốc gia"] * 25
+        with open(self.input_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def _run(self, workers, chunk_size):
+        output_path = os.path.join(self.tmpdir.name, f"out_{workers}.txt")
+        processed = transcribe_file(self.input_path, output_path, workers, chunk_size)
+        with open(output_path, encoding="utf-8") as f:
+            return processed, f.read().splitlines()
+    
+    def test_parallel_output_order(self):
+        """Test kết quả song song giữ nguyên thứ tự như chạy tuần tự"""
+        sequential = self._run(workers=1, chunk_size=1000)
+        parallel = self._run(workers=2, chunk_size=7)
+        self.assertEqual(sequential, parallel)
+        self.assertEqual(sequential[0], 100)
+        self.assertEqual(sequential[1][1], "")
+        self.assertIn("/c-/", sequential[1][0])
+    
+    def test_jsonl_output(self):
+        """Test xuất JSONL mỗi âm tiết một bản ghi, song song giữ thứ tự"""
+        output_path = os.path.join(self.tmpdir.name, "out.jsonl")
+        transcribe_file(self.input_path, output_path, workers=2, chunk_size=7, fmt='jsonl')
+        with open(output_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 8 * 25)
+        self.assertEqual(records[0], {'line': 1, 'position': 0, 'syllable': 'xin',
+                                      'transcription': '/s-//-i-//-n/ ngang (˧)'})
+        self.assertEqual((records[2]['line'], records[2]['syllable']), (3, 'tôi'))
+        self.assertEqual(records[-1]['line'], 100)
+    
+    def test_invalid_chunk_size_and_workers(self):
+        """Test từ chối --chunk-size < 1 và --workers < 0 ngay khi đọc tham số"""
+        output_path = os.path.join(self.tmpdir.name, "out.txt")
+        for options in (['--chunk-size', '0'], ['-w', '-1']):
+            with mock.patch('sys.stderr', io.StringIO()), self.assertRaises(SystemExit):
+                main.main(['-i', self.input_path, '-o', output_path] + options)
+            with mock.patch('sys.stderr', io.StringIO()), self.assertRaises(SystemExit):
+                evaluate_main(['-i', self.input_path, '-o', output_path] + options)
+        self.assertFalse(os.path.exists(output_path))
+        with self.assertRaises(ValueError):
+            evaluate(["xin"], chunk_size=0)
+
+
+class TestRecordFormatter(unittest.TestCase):
+    """Test định dạng bản ghi JSONL/TSV"""
+    
+    def setUp(self):
+        self.transcriber = VietnamesePhonemeTranscriber()
+    
+    def test_tsv_selected_fields(self):
+        """Test TSV chỉ xuất các trường được chọn, line/position đứng đầu"""
+        formatter = RecordFormatter(self.transcriber, 'tsv',
+                                    ['syllable', 'position', 'tone', 'final_ipa'])
+        self.assertEqual(formatter.header(), "position\tsyllable\ttone\tfinal_ipa\n")
+        self.assertEqual(formatter.format_line(5, "xin chào!"),
+                         "0\txin\tngang\t/-n/\n1\tchào\thuyền\t/-w/\n")
+    
+    def test_jsonl_matches_transcription(self):
+        """Test JSONL khớp kết quả phiên âm dạng dictionary"""
+        formatter = RecordFormatter(self.transcriber, 'jsonl',
+                                    ['syllable', 'initial', 'nucleus_ipa', 'transcription'])
+        record = json.loads(formatter.format_line(1, "Quốc"))
+        expected = self.transcriber.transcribe_syllable("Quốc")
+        self.assertEqual(record['initial'], expected['components']['initial'])
+        self.assertEqual(record['nucleus_ipa'], expected['phonemes']['nucleus'])
+        self.assertEqual(record['transcription'], expected['full_transcription'])
+    
+    def test_invalid_field(self):
+        """Test từ chối trường không hợp lệ"""
+        with self.assertRaises(ValueError):
+            RecordFormatter(self.transcriber, 'tsv', ['syllable', 'foo'])
+
+
+class TestCompactTranscription(unittest.TestCase):
+    """Test kết quả phiên âm dạng gọn"""
+    
+    def setUp(self):
+        self.transcriber = VietnamesePhonemeTranscriber()
+    
+    def test_symbol_table_interning(self):
+        """Test nội trú ký hiệu cấp id ổn định"""
+        table = SymbolTable()
+        self.assertEqual(table.intern("ng"), 0)
+        self.assertEqual(table.intern("nh"), 1)
+        self.assertEqual(table.intern("ng"), 0)
+        self.assertEqual(table[1], "nh")
+        self.assertIsNone(table.id_of("ch"))
+    
+    def test_symbol_table_limit(self):
+        """Test bảng ký hiệu đầy trả về giá trị nguyên dạng thay vì cấp id mới"""
+        table = SymbolTable(limit=2)
+        self.assertEqual(table.intern("ng"), 0)
+        self.assertEqual(table.intern("nh"), 1)
+        self.assertEqual(table.intern("ch"), "ch")
+        self.assertEqual(table.intern("ng"), 0)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table["ch"], "ch")
+        self.assertIsNone(table.id_of("ch"))
+    
+    def test_compact_junk_does_not_grow_symbols(self):
+        """Test âm tiết rác không làm bảng ký hiệu dùng chung tăng quá giới hạn"""
+        full = SymbolTable(limit=0)
+        with mock.patch.dict(main.SLOT_SYMBOLS, {'nucleus': full}):
+            transcriber = VietnamesePhonemeTranscriber(cache_size=0)
+            for syllable in ["adốt", "xyzw", "bcdfg"]:
+                compact = transcriber.transcribe_syllable_compact(syllable)
+                self.assertEqual(compact.to_dict(), transcriber.transcribe_syllable(syllable))
+        self.assertEqual(len(full), 0)
+        self.assertLessEqual(max(len(t) for t in main.SLOT_SYMBOLS.values()),
+                             main.MAX_SLOT_SYMBOLS)
+    
+    def test_compact_matches_dict(self):
+        """Test dạng gọn dựng lại đúng kết quả dạng dictionary"""
+        for syllable in ["xin", "chào", "quán", "nghiêng", "Người", "uống"]:
+            compact = self.transcriber.transcribe_syllable_compact(syllable)
+            self.assertIsInstance(compact, CompactTranscription)
+            self.assertEqual(compact.to_dict(), self.transcriber.transcribe_syllable(syllable))
+    
+    def test_compact_is_immutable_and_shared(self):
+        """Test kết quả gọn bất biến và dùng chung khi lặp lại"""
+        results = self.transcriber.transcribe_text_compact("và và và")
+        self.assertIs(results[0], results[2])
+        self.assertEqual(results[0].tone, 1)
+        with self.assertRaises(AttributeError):
+            results[0].tone = 2
+
+
+class TestIncrementalDocument(unittest.TestCase):
+    """Test phiên âm tăng dần khi sửa văn bản"""
+    
+    def setUp(self):
+        self.transcriber = VietnamesePhonemeTranscriber()
+    
+    def test_insert_and_delete(self):
+        """Test chèn/xóa chỉ trả về các âm tiết thay đổi"""
+        doc = IncrementalDocument(self.transcriber, "xin chào bạn")
+        change = doc.insert(8, " các")
+        self.assertEqual(doc.text, "xin chào các bạn")
+        self.assertEqual((change.index, change.removed), (2, 0))
+        self.assertEqual([a[:3] for a in change.added], [("các", 9, 12)])
+        
+        change = doc.delete(0, 1)
+        self.assertEqual((change.index, change.removed), (0, 1))
+        self.assertEqual(change.added[0][0], "in")
+        self.assertEqual(change.added[0][3], self.transcriber.transcribe_syllable("in"))
+    
+    def test_merge_split_across_blocks(self):
+        """Test sửa ngẫu nhiên luôn khớp với tách lại toàn bộ văn bản"""
+        doc = IncrementalDocument(self.transcriber, "xin chào, tôi là sinh-viên")
+        doc.BLOCK_SIZE = 2
+        rng = random.Random(7)
+        alphabet = "ab ,-ệươ\n\u0301\u0323"
+        for _ in range(500):
+            offset = rng.randint(0, len(doc.text))
+            length = rng.randint(0, min(3, len(doc.text) - offset))
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3)))
+            doc.replace(offset, length, text)
+            self.assertEqual(doc.syllables(), list(tokenize(doc.text)))
+        self.assertEqual(doc.results(), self.transcriber.transcribe_text(doc.text))
+    
+    def test_edit_before_combining_mark(self):
+        """Test dấu tổ hợp đứng sau vùng sửa được gắn lại vào âm tiết vừa sửa"""
+        doc = IncrementalDocument(self.transcriber, unicodedata.normalize('NFD', "xin á"))
+        doc.delete(4, 1)
+        self.assertEqual(doc.syllables(), list(tokenize(doc.text)))
+        change = doc.insert(4, "o")
+        self.assertEqual(doc.syllables(), [("xin", 0, 3), ("ó", 4, 6)])
+        self.assertEqual(change.added[0][3], self.transcriber.transcribe_syllable("ó"))
+    
+    def test_out_of_range_edit(self):
+        """Test từ chối vị trí sửa ngoài văn bản"""
+        doc = IncrementalDocument(self.transcriber, "xin")
+        with self.assertRaises(IndexError):
+            doc.delete(2, 5)
+
+
+class TestStageStats(unittest.TestCase):
+    """Test đo đạc theo giai đoạn phân tích"""
+    
+    def test_stage_counts_and_fallbacks(self):
+        """Test đếm số lần gọi từng giai đoạn và nhánh fallback"""
+        transcriber = VietnamesePhonemeTranscriber(cache_size=0, instrument=True)
+        transcriber.transcribe_text("xin chào adốt")
+        stats = transcriber.stage_stats()
+        for stage in ['tone', 'initial', 'final', 'medial_nucleus', 'mapping', 'formatting']:
+            self.assertEqual(stats['stages'][stage]['calls'], 3)
+            self.assertGreaterEqual(stats['stages'][stage]['seconds'], 0.0)
+        self.assertEqual(stats['fallbacks'], {'nucleus': 1})
+        
+        transcriber.reset_stage_stats()
+        self.assertEqual(transcriber.stage_stats(), {'stages': {}, 'fallbacks': {}})
+    
+    def test_table_build_not_counted(self):
+        """Test biên dịch bảng khi khởi tạo không tính vào số liệu đo"""
+        # Xóa bảng dùng chung để buộc biên dịch lại trong lúc khởi tạo
+        with mock.patch.dict(main._SHARED_TABLE_ENTRIES, clear=True):
+            transcriber = VietnamesePhonemeTranscriber(use_table=True, instrument=True)
+            self.assertEqual(transcriber.stage_stats(), {'stages': {}, 'fallbacks': {}})
+            transcriber.transcribe_syllable("adốt")
+            self.assertEqual(transcriber.stage_stats()['stages']['tone']['calls'], 1)
+    
+    def test_instrumented_results_unchanged(self):
+        """Test bật đo đạc không làm thay đổi kết quả"""
+        plain = VietnamesePhonemeTranscriber()
+        instrumented = VietnamesePhonemeTranscriber(instrument=True)
+        self.assertEqual(plain.stage_stats(), {})
+        for syllable in ["nghiêng", "quán", "uống", "adốt"]:
+            self.assertEqual(plain.transcribe_syllable(syllable),
+                             instrumented.transcribe_syllable(syllable))
+
+
+@unittest.skipIf(numpy is None, "cần numpy")
+class TestFeatureEncoder(unittest.TestCase):
+    """Test mã hóa âm tiết thành mảng đặc trưng NumPy"""
+    
+    def setUp(self):
+        self.transcriber = VietnamesePhonemeTranscriber()
+        self.vocabularies = self.transcriber.feature_encoder().vocabularies
+    
+    def test_encode_shape_and_ids(self):
+        """Test mảng (N, 5) liên tục và id khớp ký hiệu âm vị"""
+        syllables = ["xin", "chào", "quán"]
+        features = self.transcriber.encode_features(syllables)
+        self.assertEqual(features.shape, (3, len(FEATURE_SLOTS)))
+        self.assertTrue(features.flags['C_CONTIGUOUS'])
+        
+        for syllable, row in zip(syllables, features):
+            phonemes = self.transcriber.transcribe_syllable(syllable)['phonemes']
+            for slot, value in zip(FEATURE_SLOTS[:4], row[:4]):
+                self.assertEqual(self.vocabularies[slot][value], phonemes[slot])
+            self.assertIn(self.vocabularies['tone'][row[4]], phonemes['tone'])
+    
+    def test_encode_stream_and_unknown(self):
+        """Test mã hóa luồng và đánh dấu thành phần lạ"""
+        features = self.transcriber.encode_features(iter(["adốt", "ma"]))
+        self.assertEqual(features[0][2], UNKNOWN_ID)
+        self.assertNotIn(UNKNOWN_ID, features[1])
+        self.assertEqual(self.transcriber.encode_features([]).shape, (0, 5))
+
+    def test_junk_does_not_grow_component_ids(self):
+        """Test âm tiết rác không làm bảng ghi nhớ thành phần tăng quá giới hạn"""
+        encoder = self.transcriber.feature_encoder()
+        with mock.patch.object(main, 'MAX_SLOT_SYMBOLS', 2):
+            rows = [encoder.encode_syllable(s) for s in ["adốt", "xyzw", "bcdfg", "ma"]]
+        self.assertLessEqual(max(len(ids) for ids in encoder._component_ids.values()), 2)
+        fresh = VietnamesePhonemeTranscriber().feature_encoder()
+        self.assertEqual(rows, [fresh.encode_syllable(s) for s in ["adốt", "xyzw", "bcdfg", "ma"]])
+
+
+class TestTranscriptionServer(unittest.TestCase):
+    """Test dịch vụ phiên âm asyncio gom lô"""
+    
+    async def _request(self, port, method, path, payload=None):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(body)
+    
+    def test_concurrent_requests_are_batched(self):
+        """Test các yêu cầu đồng thời được gom lô và trả đúng kết quả"""
+        async def scenario():
+            batcher = MicroBatcher(VietnamesePhonemeTranscriber(),
+                                   max_batch_size=16, max_wait_ms=50)
+            server = TranscriptionServer(batcher)
+            await server.start('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                texts = ["xin chào", "tôi là", "quốc gia"] * 4
+                responses = await asyncio.gather(*[
+                    self._request(port, 'POST', '/transcribe', {'text': t}) for t in texts])
+                _, stats = await self._request(port, 'GET', '/stats')
+                bad = await self._request(port, 'POST', '/transcribe', {'foo': 1})
+            finally:
+                await server.stop()
+            return texts, responses, stats, bad
+        
+        texts, responses, stats, bad = asyncio.run(scenario())
+        reference = VietnamesePhonemeTranscriber()
+        for text, (status, payload) in zip(texts, responses):
+            self.assertEqual(status, 200)
+            self.assertEqual(payload['results'][0], reference.transcribe_text(text))
+        self.assertEqual(stats['requests'], len(texts))
+        self.assertLess(stats['batches'], len(texts))
+        self.assertIn('p99', stats['latency_ms'])
+        self.assertEqual(bad[0], 400)
+    
+    def test_malformed_requests_rejected(self):
+        """Test trả 400 cho Content-Length hỏng và "texts" không phải danh sách"""
+        async def raw(port, length):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"POST /transcribe HTTP/1.1\r\nContent-Length: {length}\r\n\r\n"
+                         .encode('latin-1'))
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return int(response.split()[1])
+        
+        async def scenario():
+            batcher = MicroBatcher(VietnamesePhonemeTranscriber(), max_wait_ms=0)
+            server = TranscriptionServer(batcher)
+            await server.start('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                statuses = [await raw(port, length) for length in ('abc', '-5')]
+                statuses.append((await self._request(port, 'POST', '/transcribe',
+                                                     {'texts': 'ab'}))[0])
+                _, health = await self._request(port, 'GET', '/health')
+            finally:
+                await server.stop()
+            return statuses, health
+        
+        statuses, health = asyncio.run(scenario())
+        self.assertEqual(statuses, [400, 400, 400])
+        self.assertEqual(health, {'status': 'ok'})
+    
+    def test_backpressure_rejects_when_full(self):
+        """Test từ chối yêu cầu khi hàng đợi đầy"""
+        async def scenario():
+            batcher = MicroBatcher(VietnamesePhonemeTranscriber(),
+                                   max_batch_size=1, max_wait_ms=0, max_pending=1)
+            await batcher.start()
+            try:
+                outcomes = await asyncio.gather(
+                    *[batcher.submit(["xin chào"]) for _ in range(5)],
+                    return_exceptions=True)
+            finally:
+                await batcher.stop()
+            return outcomes, batcher.stats()
+        
+        outcomes, stats = asyncio.run(scenario())
+        self.assertGreater(stats['rejected'], 0)
+        self.assertTrue(any(isinstance(o, list) for o in outcomes))
+
+
+class TestLexicon(unittest.TestCase):
+    """Test cases cho từ điển DAWG"""
+    
+    def setUp(self):
+        self.words = ['hoa', 'hoà', 'hòa', 'hóa', 'hoàn', 'hoang', 'hoàng', 'nghiêng', 'nguyễn']
+        self.lexicon = Lexicon.build(self.words)
+    
+    def test_exact_lookup(self):
+        """Test tra chính xác"""
+        for word in self.words:
+            self.assertIn(word, self.lexicon)
+        for word in ['ho', 'hoan', 'hoangg', '', 'xyz']:
+            self.assertNotIn(word, self.lexicon)
+        self.assertEqual(len(self.lexicon), len(self.words))
+    
+    def test_prefix_enumeration(self):
+        """Test liệt kê theo tiền tố, đúng thứ tự từ điển"""
+        self.assertEqual(list(self.lexicon.complete('hoa')),
+                         sorted(w for w in self.words if w.startswith('hoa')))
+        self.assertEqual(list(self.lexicon.complete('ng')), ['nghiêng', 'nguyễn'])
+        self.assertEqual(list(self.lexicon.complete('hoa', limit=2)), ['hoa', 'hoang'])
+        self.assertEqual(list(self.lexicon.complete('x')), [])
+        self.assertEqual(list(self.lexicon), sorted(self.words))
+    
+    def test_toneless_lookup(self):
+        """Test tra không phân biệt thanh điệu, giữ dấu mũ/móc"""
+        self.assertEqual(self.lexicon.lookup_toneless('hoa'), sorted(['hoa', 'hoà', 'hòa', 'hóa']))
+        self.assertEqual(self.lexicon.lookup_toneless('hoạ'), sorted(['hoa', 'hoà', 'hòa', 'hóa']))
+        self.assertEqual(self.lexicon.lookup_toneless('nguyên'), ['nguyễn'])
+        self.assertEqual(self.lexicon.lookup_toneless('nguyen'), [])
+        self.assertEqual(strip_tone('nguyễn'), 'nguyên')
+    
+    def test_save_load(self):
+        """Test ghi/đọc file nhị phân"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lexicon.dawg')
+            self.lexicon.save(path)
+            loaded = Lexicon.load(path)
+        self.assertEqual(list(loaded), list(self.lexicon))
+        self.assertEqual(loaded.node_count, self.lexicon.node_count)
+    
+    def test_full_lexicon(self):
+        """Test từ điển dựng từ dữ liệu GK2 và rimes.txt được tối tiểu hóa"""
+        lexicon = build_lexicon()
+        for word in ['nghiêng', 'khuỷu', 'quốc', 'gì', 'hoà', 'hòa']:
+            self.assertIn(word, lexicon)
+        self.assertLess(lexicon.node_count, len(lexicon))
+
+
+class TestEvaluation(unittest.TestCase):
+    """Test cases cho bộ đánh giá trên danh sách groundtruth"""
+    
+    SYLLABLES = ['hoa', 'nghiêng', 'bệnh', 'gì', 'pin', 'bìu', 'quốc']
+    
+    def test_anomalies_grouped_by_component(self):
+        """Test phân loại bất thường theo thành phần"""
+        report = evaluate(self.SYLLABLES)
+        self.assertEqual(report['total'], len(self.SYLLABLES))
+        anomalies = report['anomalies']
+        self.assertEqual([r['syllable'] for r in anomalies['final']['misparse']], ['bệnh'])
+        self.assertEqual([r['syllable'] for r in anomalies['nucleus']['empty']], ['gì'])
+        self.assertEqual([r['syllable'] for r in anomalies['initial']['misparse']], ['pin'])
+        self.assertIn('bìu', [r['syllable'] for r in anomalies['nucleus']['fallback']])
+        self.assertEqual(report['counts']['medial'], {})
+        # Bộ đếm fallback lấy từ StageStats của bộ phiên âm
+        self.assertEqual(report['fallbacks']['nucleus'],
+                         len(anomalies['nucleus']['fallback']) + len(anomalies['nucleus']['empty']))
+    
+    def test_parallel_matches_sequential(self):
+        """Test chạy song song cho cùng báo cáo với chạy tuần tự"""
+        sequential = evaluate(self.SYLLABLES * 3, workers=0, chunk_size=4)
+        parallel = evaluate(self.SYLLABLES * 3, workers=2, chunk_size=4)
+        for report in (sequential, parallel):
+            report.pop('seconds')
+            report.pop('workers')
+        self.assertEqual(sequential, parallel)
+
+
+class TestPhonemeIndex(unittest.TestCase):
+    """Test cases cho chỉ mục ngược âm vị -> chữ viết"""
+    
+    def setUp(self):
+        self.syllables = ['kiễng', 'khiễng', 'kiếng', 'tiếng', 'tiễn', 'nghiêng', 'hoa']
+        self.index = PhonemeIndex.build(self.syllables)
+    
+    def test_multi_key_query(self):
+        """Test giao nhiều khóa: âm chính, âm cuối, thanh"""
+        self.assertEqual(self.index.query(nucleus='/-ie-/', final='/-ŋ/', tone='ngã'),
+                         ['khiễng', 'kiễng'])
+        self.assertEqual(self.index.query(nucleus='/-ie-/', final='/-ŋ/'),
+                         ['khiễng', 'kiếng', 'kiễng', 'nghiêng', 'tiếng'])
+        self.assertEqual(self.index.query(medial='/-w-/'), ['hoa'])
+    
+    def test_query_key_forms(self):
+        """Test viết tắt ký hiệu và các dạng thanh điệu"""
+        expected = self.index.query(nucleus='/-ie-/', final='/-ŋ/', tone='ngã')
+        self.assertEqual(self.index.query(nucleus='ie', final='ŋ', tone=4), expected)
+        self.assertEqual(self.index.query(nucleus='ie', final='ŋ', tone='ngã (˧ˀ˥)'), expected)
+        self.assertEqual(self.index.query(nucleus='ie', final='ŋ', tone='4'), expected)
+        self.assertEqual(self.index.query(final='zero'), ['hoa'])
+    
+    def test_no_match_and_no_keys(self):
+        """Test ký hiệu không có trong chỉ mục và truy vấn rỗng"""
+        self.assertEqual(self.index.query(nucleus='/-xyz-/', final='/-ŋ/'), [])
+        self.assertEqual(self.index.query(), sorted(self.syllables))
+        with self.assertRaises(ValueError):
+            self.index.query(coda='/-ŋ/')
+    
+    def test_save_load(self):
+        """Test ghi/đọc chỉ mục"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'index.json')
+            self.index.save(path)
+            loaded = PhonemeIndex.load(path)
+        self.assertEqual(loaded.query(nucleus='ie', tone='sắc'),
+                         self.index.query(nucleus='ie', tone='sắc'))
+        self.assertEqual(len(loaded), len(self.syllables))
+    
+    def test_rebuild_when_rules_change(self):
+        """Test dựng lại chỉ mục đã lưu khi luật phiên âm thay đổi"""
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'syllables.txt')
+            path = os.path.join(tmp, 'index.json')
+            self.index.save(path)
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write('hoa\n')
+            os.utime(source, (0, 0))
+            # Chỉ mục mới hơn nguồn và cùng luật: đọc lại, không dựng
+            self.assertEqual(len(PhonemeIndex.load_or_build(path, source)), len(self.syllables))
+            with mock.patch('phoneme_index.rules_fingerprint', return_value='changed'):
+                with self.assertRaises(ValueError):
+                    PhonemeIndex.load(path)
+                self.assertEqual(PhonemeIndex.load_or_build(path, source).syllables, ['hoa'])
+                self.assertEqual(PhonemeIndex.load(path).syllables, ['hoa'])
+
+
+class TestSortedMerge(unittest.TestCase):
+    """Test cases cho sắp xếp ngoài và so sánh trộn của GK2"""
+    
+    def setUp(self):
+        rng = random.Random(7)
+        alphabet = "abcđêơưáà"
+        self.items = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 3)))
+                      for _ in range(400)]
+    
+    def test_in_memory(self):
+        """Test danh sách vừa bộ nhớ không cần file tạm"""
+        self.assertEqual(list(external_sort(self.items)), sorted(set(self.items)))
+        self.assertEqual(list(external_sort([])), [])
+    
+    def test_multi_pass_merge(self):
+        """Test số run vượt MAX_FAN_IN: trộn nhiều lượt vẫn đúng thứ tự và loại trùng"""
+        with mock.patch.object(sorted_merge, 'MAX_FAN_IN', 3):
+            # 400 phần tử, 7 phần tử mỗi run -> 58 run, cần nhiều lượt trộn 3 đường
+            result = list(external_sort(iter(self.items), max_items=7))
+        self.assertEqual(result, sorted(set(self.items)))
+        self.assertEqual(list(external_sort(self.items, max_items=1)), sorted(set(self.items)))
+    
+    def test_invalid_max_items(self):
+        """Test từ chối max_items nhỏ hơn 1"""
+        with self.assertRaises(ValueError):
+            list(external_sort(self.items, max_items=0))
+    
+    def test_merge_diff(self):
+        """Test so sánh hai dãy đã sắp xếp"""
+        left, right = sorted(set(self.items[:250])), sorted(set(self.items[150:]))
+        diff = list(merge_diff(left, right))
+        self.assertEqual([item for item, _, _ in diff], sorted(set(left) | set(right)))
+        for item, in_left, in_right in diff:
+            self.assertEqual((in_left, in_right), (item in left, item in right))
+        self.assertEqual(list(merge_diff([], ["a"])), [("a", False, True)])
+
+
+class TestSyllableIndex(unittest.TestCase):
+    """Test cases cho chỉ mục âm tiết nhị phân qua mmap của GK2"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'syllables.idx')
+        self.words = ['a', 'bê', 'nghiêng', 'quốc', 'zô', 'đường', 'ươi']
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_round_trip(self):
+        """Test dựng -> mmap -> tra cứu, kể cả khóa không phải ASCII"""
+        self.assertEqual(build_index(self.words + ['bê'], self.path), len(self.words))
+        with SyllableIndex(self.path) as index:
+            self.assertEqual(len(index), len(self.words))
+            for word in self.words:
+                self.assertIn(word, index)
+            for word in ['', 'b', 'bế', 'nghiên', 'đườngg', 'ư', '{']:
+                self.assertNotIn(word, index)
+            # Thứ tự byte UTF-8 (đ, ư sau z)
+            self.assertEqual(list(index), sorted(self.words))
+    
+    def test_empty_index(self):
+        """Test chỉ mục rỗng"""
+        self.assertEqual(build_index([], self.path), 0)
+        with SyllableIndex(self.path) as index:
+            self.assertEqual(len(index), 0)
+            self.assertNotIn('a', index)
+            self.assertEqual(list(index), [])
+    
+    def test_truncated_and_invalid_files(self):
+        """Test file bị cắt cụt hoặc sai định dạng báo ValueError"""
+        build_index(self.words, self.path)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        broken = os.path.join(self.tmp.name, 'broken.idx')
+        for size in range(len(data)):
+            with open(broken, 'wb') as f:
+                f.write(data[:size])
+            with self.assertRaises(ValueError):
+                SyllableIndex(broken)
+        with open(broken, 'wb') as f:
+            f.write(b'NOTANIDX' + data[8:])
+        with self.assertRaises(ValueError):
+            SyllableIndex(broken)
+
+
+class GK2Workspace(unittest.TestCase):
+    """
+    Thư mục làm việc tạm cho các script GK2 (dùng đường dẫn tương đối data/,
+    output/, test/), với một phần đầu của VDic_uni.txt để chạy nhanh
+    """
+    
+    VDIC_LINES = 3000
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for sub in ('data', 'output', 'test'):
+            os.makedirs(os.path.join(self.tmp.name, sub))
+        for name in ('rimes.txt', 'blacklist.txt', 'groundtruth_syllables.txt'):
+            self.write(os.path.join('data', name), self.read(os.path.join(GK2_DIR, 'data', name)))
+        with open(os.path.join(GK2_DIR, 'data', 'VDic_uni.txt'), encoding='utf-8', newline='') as f:
+            vdic = ''.join(line for _, line in zip(range(self.VDIC_LINES), f))
+        self.write(os.path.join('data', 'VDic_uni.txt'), vdic)
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+    
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+    
+    def read(self, path):
+        with open(os.path.join(self.tmp.name, path), encoding='utf-8', newline='') as f:
+            return f.read()
+    
+    def write(self, path, text):
+        with open(os.path.join(self.tmp.name, path), 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+    
+    def run_script(self, module, argv=()):
+        """Chạy module.main(argv), trả về những gì script in ra"""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            module.main(list(argv))
+        return out.getvalue()
+
+
+class TestExtractSyllables(GK2Workspace):
+    """Test các chế độ chạy của extract_syllables cho kết quả như chạy tuần tự"""
+    
+    def outputs(self, argv=()):
+        printed = self.run_script(extract_syllables, argv)
+        return (printed, self.read(extract_syllables.OUTPUT_FILE),
+                self.read(extract_syllables.REPORT_FILE))
+    
+    def test_parallel_matches_sequential(self):
+        """Test -w 2 với chunk rất nhỏ: gộp theo thứ tự cho output giống hệt"""
+        sequential = self.outputs()
+        self.assertGreater(len(extract_syllables.find_chunks(extract_syllables.INPUT_FILE, 2048)), 10)
+        self.assertEqual(self.outputs(['-w', '2', '--chunk-mb', str(2048 / (1 << 20))]),
+                         sequential)
+        # Chunk 1 byte: mỗi dòng một chunk
+        self.assertEqual(self.outputs(['-w', '2', '--chunk-mb', '0.000001']), sequential)
+    
+    def test_splitter_cases(self):
+        """Test tách âm đầu/vần và lọc dòng giữ nguyên hành vi tách theo từng dòng cũ"""
+        split = extract_syllables.make_splitter(extract_syllables.load_rimes())
+        cases = {
+            'nghiêng': ('ngh', 'iêng'), 'Quốc': ('qu', 'ôc'), 'quá': ('qu', 'a'),
+            'giữ': ('gi', 'ư'), 'gìn': ('g', 'in'), 'gi': ('g', 'i'),
+            'khuỷu': ('kh', 'uyu'), 'ĐÀ': ('đ', 'a'), 'uống': ('', 'uông'), 'Ỷ': ('', 'y'),
+            'ông,': (None, None), '(cũ)': (None, None), 'x.y': (None, None),
+        }
+        for word, expected in cases.items():
+            self.assertEqual(split(word), expected, word)
+            # Lần gọi thứ hai lấy từ bộ nhớ ghi nhớ
+            self.assertEqual(split(word), expected, word)
+        
+        lines = ["Hà Nội\t\tNp\n", "a-đrê-na-lin\t\tNp\n", "ông, bà\t\tN\n",
+                 "ngoằn ngoèo\t\tA\n", "KHÔNG tab\n", "\n", "(cũ) giữ gìn\t\tV\n",
+                 "bRrr tr\t\tX\n"]
+        total, found, stats, examples = extract_syllables.process_lines(
+            lines, extract_syllables.load_rimes(), {'bà'})
+        self.assertEqual(total, 6)
+        self.assertEqual(list(found), ['hà', 'nội', 'ngoằn', 'ngoèo', 'giữ', 'gìn'])
+        self.assertEqual(found['hà'], ('h', 'a', 'Hà'))
+        self.assertEqual(dict(stats), {'kept': 6, 'compound': 1, 'rime_not_matched': 2,
+                                       'blacklist': 1, 'no_vowel': 2})
+        self.assertEqual(examples['rime_not_matched'], ['ông,', '(cũ)'])
+        self.assertEqual(examples['no_vowel'], ['bRrr', 'tr'])
+    
+    def test_incremental_invalidation(self):
+        """Test --incremental sau khi sửa VDic, rimes.txt, blacklist.txt khớp lần chạy đầy đủ"""
+        def incremental():
+            result, reused, chunks = extract_syllables.extract_incremental(
+                extract_syllables.INPUT_FILE, extract_syllables.load_rimes(),
+                extract_syllables.load_blacklist())
+            with open(extract_syllables.INPUT_FILE, encoding='utf-8') as f:
+                full = extract_syllables.process_lines(
+                    f, extract_syllables.load_rimes(), extract_syllables.load_blacklist())
+            self.assertEqual(result, full)
+            return reused, chunks
+        
+        self.assertEqual(incremental()[0], 0)
+        reused, chunks = incremental()
+        self.assertEqual(reused, chunks)
+        self.assertGreater(chunks, 2)
+        
+        # Sửa một dòng và chèn một dòng ở giữa VDic: chỉ các chunk chứa chúng bị xử lý lại
+        lines = self.read(extract_syllables.INPUT_FILE).splitlines(keepends=True)
+        middle = len(lines) // 2
+        lines[middle] = "xoàng xĩnh\t\tA\n"
+        lines.insert(middle + 1, "Ngoằn ngoèo\t\tA\n")
+        self.write(extract_syllables.INPUT_FILE, ''.join(lines))
+        reused, chunks = incremental()
+        self.assertTrue(0 < reused < chunks)
+        
+        # Bỏ một vần khỏi rimes.txt rồi thêm lại
+        rimes = self.read(extract_syllables.RIMES_FILE)
+        self.write(extract_syllables.RIMES_FILE,
+                   ''.join(r for r in rimes.splitlines(keepends=True) if r.strip() != 'oeo'))
+        reused, chunks = incremental()
+        self.assertTrue(0 < reused < chunks)
+        self.write(extract_syllables.RIMES_FILE, rimes)
+        incremental()
+        
+        # Thêm vào blacklist.txt một âm tiết chỉ có ở dòng vừa sửa
+        self.write(extract_syllables.BLACKLIST_FILE,
+                   self.read(extract_syllables.BLACKLIST_FILE) + "xĩnh\n")
+        reused, chunks = incremental()
+        self.assertTrue(0 < reused < chunks)
+        self.assertEqual(incremental()[0], chunks)
+
+
+class TestStreamingCompare(GK2Workspace):
+    """Test chế độ --streaming của hai script so sánh cho kết quả như chế độ set"""
+    
+    def setUp(self):
+        super().setUp()
+        self.run_script(extract_syllables)
+    
+    def test_compare_syllables(self):
+        """Test compare_syllables: file khác biệt và số liệu giống nhau"""
+        files = (compare_syllables.OUTPUT_FILE, compare_syllables.EXPECTED_ONLY_FILE)
+        printed = self.run_script(compare_syllables)
+        expected = [self.read(path) for path in files]
+        self.assertEqual(self.run_script(compare_syllables, ['--streaming', '--max-items', '50']),
+                         printed)
+        self.assertEqual([self.read(path) for path in files], expected)
+    
+    def test_not_in_vdic_streams_results(self):
+        """Test groundtruth_not_in_vdic: kết quả được sinh dần rồi ghi thẳng ra file"""
+        self.run_script(compare_syllables)
+        printed = self.run_script(groundtruth_not_in_vdic_script)
+        expected = self.read(groundtruth_not_in_vdic_script.OUTPUT_FILE)
+        self.assertTrue(expected)
+        self.assertEqual(self.run_script(groundtruth_not_in_vdic_script,
+                                         ['--streaming', '--max-items', '50']), printed)
+        self.assertEqual(self.read(groundtruth_not_in_vdic_script.OUTPUT_FILE), expected)
+        
+        counts = {}
+        missing = groundtruth_not_in_vdic_script.find_streaming(counts, 50)
+        self.assertNotIsInstance(missing, list)
+        self.assertEqual(''.join(w + '\n' for w in missing), expected)
+        self.assertIn(f"Found {counts['common']} syllables in both files", printed)
+
+
+class TestPipeline(GK2Workspace):
+    """Test pipeline.py cho cùng các file kết quả như chạy lần lượt ba script"""
+    
+    FILES = (extract_syllables.OUTPUT_FILE, extract_syllables.REPORT_FILE,
+             compare_syllables.OUTPUT_FILE, compare_syllables.EXPECTED_ONLY_FILE,
+             groundtruth_not_in_vdic_script.OUTPUT_FILE)
+    
+    def test_matches_individual_scripts(self):
+        """Test so sánh đầu cuối: file kết quả và các dòng báo cáo giống hệt"""
+        printed = ''.join(self.run_script(module) for module in
+                          (extract_syllables, compare_syllables, groundtruth_not_in_vdic_script))
+        expected = {path: self.read(path) for path in self.FILES}
+        for path in self.FILES:
+            os.remove(path)
+        
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            pipeline.main()
+        self.assertEqual({path: self.read(path) for path in self.FILES}, expected)
+        self.assertTrue(expected[groundtruth_not_in_vdic_script.OUTPUT_FILE])
+        
+        # Các dòng báo cáo của từng script đều có trong báo cáo của pipeline (trừ số
+        # âm tiết chung, pipeline không in), kèm bảng thời gian từng bước
+        lines = out.getvalue().splitlines()
+        for line in printed.splitlines():
+            if line and 'in both files' not in line:
+                self.assertIn(line, lines)
+        self.assertIn("===== TIMINGS =====", lines)
+        for stage in ('read', 'extract', 'compare', 'not_in_vdic', 'total'):
+            self.assertTrue(any(l.strip().startswith(stage) for l in lines), stage)
+
+
 def run_tests():
     """Chạy tất cả các test cases"""
     print("=== CHẠY UNIT TESTS CHO CHƯƠNG TRÌNH PHIÊN ÂM ===\n")
@@ -402,7 +1396,24 @@ def run_tests():
         TestSyllableAnalyzer, 
         TestPhonemeMapper,
         TestVietnamesePhonemeTranscriber,
-        TestSpecialCases
+        TestSpecialCases,
+        TestSyllableCache,
+        TestTranscriptionTable,
+        TestBatchTranscription,
+        TestRecordFormatter,
+        TestCompactTranscription,
+        TestIncrementalDocument,
+        TestStageStats,
+        TestFeatureEncoder,
+        TestTranscriptionServer,
+        TestLexicon,
+        TestEvaluation,
+        TestPhonemeIndex,
+        TestSortedMerge,
+        TestSyllableIndex,
+        TestExtractSyllables,
+        TestStreamingCompare,
+        TestPipeline
     ]
     
     for test_class in test_classes:
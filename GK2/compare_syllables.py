@@ -1,15 +1,38 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
+
+from sorted_merge import MAX_ITEMS, external_sort, merge_diff, positive_int
+
 EXPECTED_FILE = "data/groundtruth_syllables.txt"
 OTHER_FILE = "output/output_syllables.txt"
 OUTPUT_FILE = "test/output_only_syllables.txt"
+EXPECTED_ONLY_FILE = "test/groundtruth_only_syllables.txt"
 
 def load_words(path):
     with open(path, "r", encoding="utf-8") as f:
         return {line.strip() for line in f if line.strip()}
 
-def main():
+def iter_words(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            w = line.strip()
+            if w:
+                yield w
+
+def write_diffs(diff, diff_expected):
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
+        for w in diff:
+            if not any(ch.isupper() for ch in w):
+                out.write(w + "\n")
+
+    with open(EXPECTED_ONLY_FILE, "w", encoding="utf-8") as out:
+        for w in diff_expected:
+            if not any(ch.isupper() for ch in w):
+                out.write(w + "\n")
+
+def compare_sets():
     expected = load_words(EXPECTED_FILE)
     other = load_words(OTHER_FILE)
 
@@ -18,20 +41,48 @@ def main():
     diff_expected = sorted(expected - other)
 
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
-        for w in diff:
-            if not any(ch.isupper() for ch in w):
-                out.write(w + "\n")
+    write_diffs(diff, diff_expected)
+    return len(diff), len(diff_expected), len(other & expected)
 
-    with open("test/groundtruth_only_syllables.txt", "w", encoding="utf-8") as out:
-        for w in diff_expected:
+def compare_streaming(max_items=MAX_ITEMS):
+    # Sắp xếp ngoài cả hai danh sách rồi trộn một lượt: bộ nhớ giới hạn bởi max_items
+    other = external_sort(iter_words(OTHER_FILE), max_items)
+    expected = external_sort(iter_words(EXPECTED_FILE), max_items)
+    n_other = n_expected = n_common = 0
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as out, \
+            open(EXPECTED_ONLY_FILE, "w", encoding="utf-8") as out_expected:
+        for w, in_other, in_expected in merge_diff(other, expected):
+            if in_other and in_expected:
+                n_common += 1
+                continue
+            if in_other:
+                n_other += 1
+                target = out
+            else:
+                n_expected += 1
+                target = out_expected
             if not any(ch.isupper() for ch in w):
-                out.write(w + "\n")
+                target.write(w + "\n")
+    return n_other, n_expected, n_common
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare extracted syllables with the ground truth")
+    parser.add_argument("--streaming", action="store_true",
+                        help="external sort + sorted-merge diff with bounded memory (for large lists)")
+    parser.add_argument("--max-items", type=positive_int, default=MAX_ITEMS,
+                        help="items held in memory per sorted run in streaming mode")
+    args = parser.parse_args(argv)
+
+    if args.streaming:
+        n_diff, n_diff_expected, n_common = compare_streaming(args.max_items)
+    else:
+        n_diff, n_diff_expected, n_common = compare_sets()
 
-    print(f"Found {len(diff)} syllables in {OTHER_FILE} but not in {EXPECTED_FILE}")
+    print(f"Found {n_diff} syllables in {OTHER_FILE} but not in {EXPECTED_FILE}")
     print(f"Saved to {OUTPUT_FILE}")
-    print(f"Found {len(diff_expected)} syllables in {EXPECTED_FILE} but not in {OTHER_FILE}")
-    print(f"Saved to test/groundtruth_only_syllables.txt")
+    print(f"Found {n_diff_expected} syllables in {EXPECTED_FILE} but not in {OTHER_FILE}")
+    print(f"Saved to {EXPECTED_ONLY_FILE}")
+    print(f"Found {n_common} syllables in both files")
 
 if __name__ == "__main__":
     main()
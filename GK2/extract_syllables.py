@@ -4,8 +4,9 @@
 Filter v7.3: tách từ nhiều âm tiết -> âm tiết đơn, bỏ âm tiết viết hoa
 """
 
-import os, unicodedata
+import argparse, hashlib, io, json, os, unicodedata, zlib
 from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 VOWEL_MAP = {
     "a":"a","á":"a","à":"a","ả":"a","ã":"a","ạ":"a",
@@ -22,14 +23,18 @@ VOWEL_MAP = {
     "y":"y","ý":"y","ỳ":"y","ỷ":"y","ỹ":"y","ỵ":"y",
 }
 
+_TONE_STRIP = str.maketrans(VOWEL_MAP)
+
 def normalize_rime_no_tone(rime: str) -> str:
-    return "".join(VOWEL_MAP.get(ch, ch) for ch in rime)
+    return rime.translate(_TONE_STRIP)
 
 
 INPUT_FILE = "data/VDic_uni.txt"
 OUTPUT_FILE = "output/output_syllables.txt"
 RIMES_FILE = "data/rimes.txt"
 BLACKLIST_FILE = "data/blacklist.txt"
+REPORT_FILE = "output/syllable_report.txt"
+STATE_FILE = "output/.extract_state.json"
 def load_blacklist():
     bl = set()
     if os.path.exists(BLACKLIST_FILE):
@@ -58,76 +63,274 @@ def load_rimes():
                 rset.add(r_nfc)
     return rset
 
+ONSET_SET = frozenset(ONSETS)
+MAX_ONSET_LEN = len(ONSETS[0])
+
 def try_split_onset_rime(word: str, rimes_set):
+    """
+    Tách âm tiết thành (âm đầu, vần không dấu), hoặc (None, None) nếu không khớp.
+    Bỏ dấu thanh một lần cho cả âm tiết rồi thử các âm đầu từ dài đến ngắn;
+    vì VOWEL_MAP ánh xạ từng ký tự nên vần bỏ dấu chính là phần đuôi của nó.
+    """
     lw = word.lower()
-    for onset in ONSETS:
-        if lw.startswith(onset):
-            rime = lw[len(onset):]
-            if not rime: continue
-            rime_norm = normalize_rime_no_tone(rime)
-            if rime_norm in rimes_set:
-                return onset, rime_norm
-    rime_norm = normalize_rime_no_tone(lw)
-    if rime_norm in rimes_set:
-        return "", rime_norm
+    norm = lw.translate(_TONE_STRIP)
+    for n in range(min(MAX_ONSET_LEN, len(lw) - 1), 0, -1):
+        if lw[:n] in ONSET_SET and norm[n:] in rimes_set:
+            return lw[:n], norm[n:]
+    if norm in rimes_set:
+        return "", norm
     return None, None
 
-def main():
-    if not os.path.exists(INPUT_FILE):
-        print("Không tìm thấy file:", INPUT_FILE)
-        return
+def make_splitter(rimes_set):
+    """Hàm tách có ghi nhớ theo âm tiết, dùng lại được cho các công cụ khác"""
+    memo = {}
 
+    def split(word):
+        result = memo.get(word)
+        if result is None:
+            result = memo[word] = try_split_onset_rime(word, rimes_set)
+        return result
 
-    rimes = load_rimes()
-    blacklist = load_blacklist()
+    return split
+
+EX_MAX = 30
+CHUNK_BYTES = 4 << 20
+
+def process_lines(lines, rimes, blacklist, vocab=None):
+    """
+    Lọc âm tiết từ các dòng VDic, trả về (total, found, stats, examples).
+    Nếu có vocab (set), thêm vào đó mọi âm tiết chữ thường đã gặp.
+    """
     found = OrderedDict()
     stats = defaultdict(int)
     examples = defaultdict(list)
-    EX_MAX = 30
+    split = make_splitter(rimes)
 
     total = 0
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or "\t" not in line:
+    for raw in lines:
+        line = raw.strip()
+        if not line or "\t" not in line:
+            continue
+        total += 1
+        word = line.split("\t", 1)[0]
+
+        for syll in word.split():
+            lw = syll.lower()
+            if vocab is not None:
+                vocab.add(lw)
+
+            if lw in blacklist:
+                stats['blacklist'] += 1
+                if len(examples['blacklist']) < EX_MAX: examples['blacklist'].append(syll)
+                continue
+
+            if "-" in syll:
+                stats['compound'] += 1
+                if len(examples['compound']) < EX_MAX: examples['compound'].append(syll)
+                continue
+
+            if not any(ch in VOWELS or ch in VOWEL_MAP for ch in lw):
+                stats['no_vowel'] += 1
+                if len(examples['no_vowel']) < EX_MAX: examples['no_vowel'].append(syll)
                 continue
-            total += 1
-            word = line.split("\t", 1)[0]
-
-            for syll in word.split():
-                lw = syll.lower()
-
-                if lw in blacklist:
-                    stats['blacklist'] += 1
-                    if len(examples['blacklist']) < EX_MAX: examples['blacklist'].append(syll)
-                    continue
-
-                if "-" in syll:
-                    stats['compound'] += 1
-                    if len(examples['compound']) < EX_MAX: examples['compound'].append(syll)
-                    continue
-
-                if not any(ch in VOWELS or ch in VOWEL_MAP for ch in lw):
-                    stats['no_vowel'] += 1
-                    if len(examples['no_vowel']) < EX_MAX: examples['no_vowel'].append(syll)
-                    continue
-
-                onset, rime = try_split_onset_rime(syll, rimes)
-                if onset is None:
-                    stats['rime_not_matched'] += 1
-                    if len(examples['rime_not_matched']) < EX_MAX: examples['rime_not_matched'].append(syll)
-                    continue
-
-                if lw not in found:
-                    found[lw] = (onset, rime)
-                    stats['kept'] += 1
-                    if len(examples['kept']) < EX_MAX: examples['kept'].append(syll)
 
+            onset, rime = split(syll)
+            if onset is None:
+                stats['rime_not_matched'] += 1
+                if len(examples['rime_not_matched']) < EX_MAX: examples['rime_not_matched'].append(syll)
+                continue
+
+            if lw not in found:
+                # Giữ dạng viết gốc để khi gộp các chunk vẫn lấy đúng ví dụ 'kept'
+                found[lw] = (onset, rime, syll)
+                stats['kept'] += 1
+                if len(examples['kept']) < EX_MAX: examples['kept'].append(syll)
+
+    return total, found, stats, examples
+
+def find_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """Chia file thành các khoảng byte [start, end) kết thúc đúng ở đầu dòng"""
+    size = os.path.getsize(path)
+    chunks = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+_worker_rimes = None
+_worker_blacklist = None
+
+def _init_worker(rimes, blacklist):
+    global _worker_rimes, _worker_blacklist
+    _worker_rimes = rimes
+    _worker_blacklist = blacklist
+
+def _process_chunk(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # newline=None: tách dòng giống hệt khi mở file ở chế độ văn bản
+    lines = io.StringIO(data.decode("utf-8"), newline=None)
+    return process_lines(lines, _worker_rimes, _worker_blacklist)
+
+def merge_results(results):
+    """
+    Gộp kết quả các chunk theo thứ tự file: thứ tự âm tiết, số liệu và
+    ví dụ trùng khớp với lần chạy tuần tự
+    """
+    total = 0
+    found = OrderedDict()
+    stats = defaultdict(int)
+    examples = defaultdict(list)
+
+    for chunk_total, chunk_found, chunk_stats, chunk_examples in results:
+        total += chunk_total
+        for k, v in chunk_stats.items():
+            if k != 'kept':
+                stats[k] += v
+        # Thứ tự khóa của examples là thứ tự xuất hiện đầu tiên của từng loại
+        for k, v in chunk_examples.items():
+            merged = examples[k]
+            if k != 'kept':
+                merged.extend(v[:EX_MAX - len(merged)])
+        for lw, (onset, rime, syll) in chunk_found.items():
+            if lw not in found:
+                found[lw] = (onset, rime, syll)
+                stats['kept'] += 1
+                if len(examples['kept']) < EX_MAX: examples['kept'].append(syll)
+
+    return total, found, stats, examples
+
+def extract_parallel(path, rimes, blacklist, workers, chunk_bytes=CHUNK_BYTES):
+    chunks = find_chunks(path, chunk_bytes)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(rimes, blacklist)) as pool:
+        futures = [pool.submit(_process_chunk, path, start, end) for start, end in chunks]
+        return merge_results(f.result() for f in futures)
+
+# Trạng thái chạy tăng dần: đổi STATE_VERSION khi logic lọc thay đổi
+STATE_VERSION = 1
+# Chia chunk theo nội dung: kết thúc chunk sau dòng có crc32 & CDC_MASK == 0
+# (trung bình ~1024 dòng), nên sửa/chèn một dòng chỉ làm đổi chunk chứa nó
+CDC_MASK = 0x3FF
+CDC_MAX_LINES = 8192
+
+def iter_content_chunks(lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if (zlib.crc32(line.encode("utf-8")) & CDC_MASK) == 0 or len(chunk) >= CDC_MAX_LINES:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def chunk_dependencies(lines):
+    """
+    Những gì kết quả của một chunk phụ thuộc vào ngoài nội dung của nó:
+    các âm tiết (chữ thường) được tra trong blacklist và các vần không dấu
+    có thể được tra trong rimes. Chunk chỉ phải xử lý lại khi một trong số
+    đó được thêm/bớt khỏi blacklist.txt hoặc rimes.txt.
+    """
+    tokens = set()
+    probes = set()
+    for raw in lines:
+        line = raw.strip()
+        if not line or "\t" not in line:
+            continue
+        for syll in line.split("\t", 1)[0].split():
+            lw = syll.lower()
+            if lw in tokens:
+                continue
+            tokens.add(lw)
+            norm = lw.translate(_TONE_STRIP)
+            probes.add(norm)
+            for n in range(min(MAX_ONSET_LEN, len(lw) - 1), 0, -1):
+                if lw[:n] in ONSET_SET:
+                    probes.add(norm[n:])
+    return sorted(tokens), sorted(probes)
+
+def _encode_result(result):
+    total, found, stats, examples = result
+    return {
+        "total": total,
+        "found": [[lw, onset, rime, syll] for lw, (onset, rime, syll) in found.items()],
+        "stats": dict(stats),
+        "examples": dict(examples),
+    }
+
+def _decode_result(data):
+    found = OrderedDict((lw, (onset, rime, syll)) for lw, onset, rime, syll in data["found"])
+    return (data["total"], found, defaultdict(int, data["stats"]),
+            defaultdict(list, data["examples"]))
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except ValueError:
+        return {}
+    return state if state.get("version") == STATE_VERSION else {}
+
+def save_state(state, path=STATE_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        # json.dumps dùng bộ mã hóa C, nhanh hơn nhiều so với json.dump ghi từng mảnh
+        f.write(json.dumps(state, ensure_ascii=False, separators=(",", ":")))
+    os.replace(tmp, path)
+
+def extract_incremental(path, rimes, blacklist, state_path=STATE_FILE):
+    """
+    Chỉ xử lý lại các chunk có nội dung mới hoặc bị ảnh hưởng bởi thay đổi
+    của rimes/blacklist; các chunk khác lấy từ trạng thái đã lưu theo sha1.
+    Trả về (kết quả đã gộp, số chunk dùng lại, tổng số chunk).
+    """
+    state = load_state(state_path)
+    old_chunks = state.get("chunks", {})
+    rimes_changed = rimes.symmetric_difference(state.get("rimes", []))
+    blacklist_changed = blacklist.symmetric_difference(state.get("blacklist", []))
+
+    chunks = {}
+    results = []
+    reused = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for lines in iter_content_chunks(f):
+            key = hashlib.sha1("".join(lines).encode("utf-8")).hexdigest()
+            entry = chunks.get(key)
+            if entry is None:
+                entry = old_chunks.get(key)
+                if entry is not None and (not blacklist_changed.isdisjoint(entry["tokens"])
+                                          or not rimes_changed.isdisjoint(entry["probes"])):
+                    entry = None
+                if entry is None:
+                    tokens, probes = chunk_dependencies(lines)
+                    entry = {"result": _encode_result(process_lines(lines, rimes, blacklist)),
+                             "tokens": tokens, "probes": probes}
+                else:
+                    reused += 1
+                chunks[key] = entry
+            else:
+                reused += 1
+            results.append(_decode_result(entry["result"]))
+
+    if reused < len(results) or rimes_changed or blacklist_changed or chunks.keys() != old_chunks.keys():
+        save_state({"version": STATE_VERSION, "rimes": sorted(rimes),
+                    "blacklist": sorted(blacklist), "chunks": chunks}, state_path)
+    return merge_results(results), reused, len(results)
+
+def write_outputs(total, found, stats, examples):
+    """Ghi output_syllables.txt và syllable_report.txt, trả về các dòng báo cáo"""
     with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
         for w in found.keys():
             out.write(w + "\n")
 
-
     kept = stats['kept']
     skipped = total - kept
     report_lines = []
@@ -146,14 +349,50 @@ def main():
     report_lines.append("")
     report_lines.append(f"Result saved to: {OUTPUT_FILE}")
 
+    with open(REPORT_FILE, "w", encoding="utf-8") as rep:
+        for line in report_lines:
+            rep.write(line + "\n")
+    return report_lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract single syllables from VDic_uni.txt")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="number of worker processes (0 = sequential)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / (1 << 20),
+                        help="approximate chunk size in MiB for parallel mode")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"reuse per-chunk results cached in {STATE_FILE}")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(INPUT_FILE):
+        print("Không tìm thấy file:", INPUT_FILE)
+        return
+
+
+    rimes = load_rimes()
+    blacklist = load_blacklist()
+
+    incremental = None
+    if args.incremental:
+        (total, found, stats, examples), reused, chunks = extract_incremental(
+            INPUT_FILE, rimes, blacklist)
+        incremental = f"Incremental: reused {reused}/{chunks} chunks from {STATE_FILE}"
+    elif args.workers > 0:
+        chunk_bytes = max(1, int(args.chunk_mb * (1 << 20)))
+        total, found, stats, examples = extract_parallel(
+            INPUT_FILE, rimes, blacklist, args.workers, chunk_bytes)
+    else:
+        with open(INPUT_FILE, "r", encoding="utf-8") as f:
+            total, found, stats, examples = process_lines(f, rimes, blacklist)
+
+    report_lines = write_outputs(total, found, stats, examples)
+
     # Print to console
     for line in report_lines:
         print(line)
 
-    # Write to file
-    with open("output/syllable_report.txt", "w", encoding="utf-8") as rep:
-        for line in report_lines:
-            rep.write(line + "\n")
+    if incremental:
+        print(incremental)
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
+
+from sorted_merge import MAX_ITEMS, external_sort, merge_diff, positive_int
+
 VDIC_FILE = "data/VDic_uni.txt"
 DIFF_EXPECTED_FILE = "test/groundtruth_only_syllables.txt"
 OUTPUT_FILE = "output/groundtruth_not_in_vdic.txt"
 
-def load_vdic_words(path):
-    words = set()
+def iter_vdic_words(path):
     with open(path, "r", encoding="utf-8") as f:
         for line in f:
             line = line.strip()
@@ -14,25 +17,65 @@ def load_vdic_words(path):
                 continue
             word, _ = line.split("\t", 1)
             for syll in word.split():
-                words.add(syll.lower())
-    return words
+                yield syll.lower()
 
-def load_list(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return {line.strip().lower() for line in f if line.strip()}
+def load_vdic_words(path):
+    return set(iter_vdic_words(path))
 
-def main():
-    vdic_words = load_vdic_words(VDIC_FILE)
-    diff_expected = load_list(DIFF_EXPECTED_FILE)
+def iter_list(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line.strip().lower()
 
-    not_in_vdic = sorted(diff_expected - vdic_words)
+def load_list(path):
+    return set(iter_list(path))
 
+def write_output(not_in_vdic):
+    # Nhận cả list lẫn generator; trả về số âm tiết đã ghi
+    n = 0
     with open(OUTPUT_FILE, "w", encoding="utf-8") as out:
         for w in not_in_vdic:
             out.write(w + "\n")
+            n += 1
+    return n
+
+def find_sets():
+    vdic_words = load_vdic_words(VDIC_FILE)
+    diff_expected = load_list(DIFF_EXPECTED_FILE)
+    return sorted(diff_expected - vdic_words), len(diff_expected & vdic_words)
+
+def find_streaming(counts, max_items=MAX_ITEMS):
+    # Sinh lần lượt các âm tiết không có trong VDic (theo thứ tự tăng dần) để ghi
+    # ngay, không giữ danh sách kết quả; số âm tiết chung đếm vào counts["common"]
+    diff_expected = external_sort(iter_list(DIFF_EXPECTED_FILE), max_items)
+    vdic_words = external_sort(iter_vdic_words(VDIC_FILE), max_items)
+    counts["common"] = 0
+    for w, in_expected, in_vdic in merge_diff(diff_expected, vdic_words):
+        if in_expected and not in_vdic:
+            yield w
+        elif in_expected:
+            counts["common"] += 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find groundtruth-only syllables missing from VDic_uni.txt")
+    parser.add_argument("--streaming", action="store_true",
+                        help="external sort + sorted-merge diff with bounded memory (for large lists)")
+    parser.add_argument("--max-items", type=positive_int, default=MAX_ITEMS,
+                        help="items held in memory per sorted run in streaming mode")
+    args = parser.parse_args(argv)
+
+    if args.streaming:
+        counts = {}
+        n_missing = write_output(find_streaming(counts, args.max_items))
+        n_common = counts["common"]
+    else:
+        not_in_vdic, n_common = find_sets()
+        n_missing = write_output(not_in_vdic)
 
-    print(f"Found {len(not_in_vdic)} syllables in {DIFF_EXPECTED_FILE} but not in {VDIC_FILE}")
+    print(f"Found {n_missing} syllables in {DIFF_EXPECTED_FILE} but not in {VDIC_FILE}")
     print(f"Saved to {OUTPUT_FILE}")
+    print(f"Found {n_common} syllables in both files")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chạy cả ba bước GK2 trong một tiến trình: mỗi file đầu vào chỉ đọc một lần,
+các bước trao đổi dữ liệu trong bộ nhớ thay vì qua file trung gian
+"""
+
+import os, time
+
+import compare_syllables
+import extract_syllables
+import groundtruth_not_in_vdic_script
+
+class StageTimer:
+    def __init__(self):
+        self.timings = []
+
+    def run(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings.append((name, time.perf_counter() - start))
+        return result
+
+    def report(self):
+        lines = ["===== TIMINGS ====="]
+        for name, seconds in self.timings:
+            lines.append(f"  {name:15s}: {seconds * 1000:9.1f} ms")
+        total = sum(seconds for _, seconds in self.timings)
+        lines.append(f"  {'total':15s}: {total * 1000:9.1f} ms")
+        return lines
+
+def read_inputs():
+    with open(extract_syllables.INPUT_FILE, "r", encoding="utf-8") as f:
+        vdic_lines = f.readlines()
+    with open(compare_syllables.EXPECTED_FILE, "r", encoding="utf-8") as f:
+        groundtruth_lines = f.readlines()
+    return vdic_lines, groundtruth_lines, extract_syllables.load_rimes(), extract_syllables.load_blacklist()
+
+def stage_extract(vdic_lines, rimes, blacklist):
+    # Thu luôn tập âm tiết của VDic (như load_vdic_words) trong cùng lượt lọc
+    vdic_words = set()
+    total, found, stats, examples = extract_syllables.process_lines(
+        vdic_lines, rimes, blacklist, vdic_words)
+    report_lines = extract_syllables.write_outputs(total, found, stats, examples)
+    return found, vdic_words, report_lines
+
+def stage_compare(found, groundtruth_lines):
+    # Giống compare_syllables.load_words trên output_syllables.txt và groundtruth
+    expected = {line.strip() for line in groundtruth_lines if line.strip()}
+    other = set(found)
+    diff = sorted(other - expected)
+    diff_expected = sorted(expected - other)
+    compare_syllables.write_diffs(diff, diff_expected)
+    return diff, diff_expected
+
+def stage_not_in_vdic(vdic_words, diff_expected):
+    # Chỉ những dòng đã ghi vào groundtruth_only_syllables.txt (không viết hoa)
+    written = {w.lower() for w in diff_expected if not any(ch.isupper() for ch in w)}
+    not_in_vdic = sorted(written - vdic_words)
+    groundtruth_not_in_vdic_script.write_output(not_in_vdic)
+    return not_in_vdic
+
+def main():
+    if not os.path.exists(extract_syllables.INPUT_FILE):
+        print("Không tìm thấy file:", extract_syllables.INPUT_FILE)
+        return
+
+    timer = StageTimer()
+    vdic_lines, groundtruth_lines, rimes, blacklist = timer.run("read", read_inputs)
+    found, vdic_words, report_lines = timer.run("extract", stage_extract, vdic_lines, rimes, blacklist)
+    diff, diff_expected = timer.run("compare", stage_compare, found, groundtruth_lines)
+    not_in_vdic = timer.run("not_in_vdic", stage_not_in_vdic, vdic_words, diff_expected)
+
+    for line in report_lines:
+        print(line)
+    print()
+    print(f"Found {len(diff)} syllables in {compare_syllables.OTHER_FILE} but not in {compare_syllables.EXPECTED_FILE}")
+    print(f"Saved to {compare_syllables.OUTPUT_FILE}")
+    print(f"Found {len(diff_expected)} syllables in {compare_syllables.EXPECTED_FILE} but not in {compare_syllables.OTHER_FILE}")
+    print(f"Saved to {compare_syllables.EXPECTED_ONLY_FILE}")
+    print(f"Found {len(not_in_vdic)} syllables in {groundtruth_not_in_vdic_script.DIFF_EXPECTED_FILE} but not in {groundtruth_not_in_vdic_script.VDIC_FILE}")
+    print(f"Saved to {groundtruth_not_in_vdic_script.OUTPUT_FILE}")
+    print()
+    for line in timer.report():
+        print(line)
+
+if __name__ == "__main__":
+    main()
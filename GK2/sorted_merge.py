@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sắp xếp ngoài (external sort) với bộ nhớ giới hạn và so sánh hai danh sách
+đã sắp xếp bằng một lượt trộn, dùng cho các danh sách quá lớn để nạp vào set
+"""
+
+import argparse, heapq, os, tempfile
+from itertools import islice
+
+# Số phần tử tối đa giữ trong bộ nhớ cho mỗi run
+MAX_ITEMS = 1_000_000
+# Số run tối đa mở cùng lúc khi trộn
+MAX_FAN_IN = 64
+
+def positive_int(value):
+    """Kiểu argparse cho --max-items: số nguyên >= 1"""
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+def _unique(items):
+    prev = None
+    for item in items:
+        if item != prev:
+            yield item
+            prev = item
+
+def _write_run(items, tmpdir):
+    fd, path = tempfile.mkstemp(suffix=".run", dir=tmpdir)
+    with open(fd, "w", encoding="utf-8", newline="\n") as f:
+        for item in items:
+            f.write(item + "\n")
+    return path
+
+def _read_run(path):
+    with open(path, "r", encoding="utf-8", newline="\n") as f:
+        for line in f:
+            yield line[:-1]
+
+def _merge_runs(paths, tmpdir):
+    """Trộn nhiều lần để không mở quá MAX_FAN_IN file một lúc"""
+    while len(paths) > MAX_FAN_IN:
+        group, paths = paths[:MAX_FAN_IN], paths[MAX_FAN_IN:]
+        paths.append(_write_run(_unique(heapq.merge(*map(_read_run, group))), tmpdir))
+        for path in group:
+            os.remove(path)
+    return _unique(heapq.merge(*map(_read_run, paths)))
+
+def external_sort(items, max_items=MAX_ITEMS):
+    """
+    Sắp xếp và loại trùng một dãy chuỗi (không chứa '\\n') với tối đa
+    max_items phần tử trong bộ nhớ. Thứ tự giống sorted(set(items)).
+    """
+    if max_items < 1:
+        raise ValueError(f"max_items must be at least 1, got {max_items}")
+    items = iter(items)
+    buf = sorted(set(islice(items, max_items)))
+    first = next(items, None)
+    if first is None:
+        # Vừa bộ nhớ: không cần file tạm
+        yield from buf
+        return
+
+    with tempfile.TemporaryDirectory(prefix="sorted_merge_") as tmpdir:
+        runs = [_write_run(buf, tmpdir)]
+        # Giải phóng run đầu ngay để đỉnh bộ nhớ chỉ là một run (max_items)
+        del buf
+        pending = [first]
+        while True:
+            pending.extend(islice(items, max_items - len(pending)))
+            if not pending:
+                break
+            runs.append(_write_run(sorted(set(pending)), tmpdir))
+            pending = []
+        yield from _merge_runs(runs, tmpdir)
+
+def merge_diff(left, right):
+    """
+    Trộn hai dãy đã sắp xếp, không trùng; sinh (item, in_left, in_right)
+    theo thứ tự tăng dần
+    """
+    left = iter(left)
+    right = iter(right)
+    a = next(left, None)
+    b = next(right, None)
+    while a is not None and b is not None:
+        if a == b:
+            yield a, True, True
+            a = next(left, None)
+            b = next(right, None)
+        elif a < b:
+            yield a, True, False
+            a = next(left, None)
+        else:
+            yield b, False, True
+            b = next(right, None)
+    while a is not None:
+        yield a, True, False
+        a = next(left, None)
+    while b is not None:
+        yield b, False, True
+        b = next(right, None)
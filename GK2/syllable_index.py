@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chỉ mục âm tiết nhị phân gọn để kiểm tra thành viên qua mmap
+
+Định dạng file (little-endian):
+    magic     8 byte  b"VSYLIDX1"
+    count     uint32  số âm tiết
+    offsets   (count + 1) x uint32, vị trí bắt đầu mỗi âm tiết trong blob
+    blob      các âm tiết UTF-8 nối liền, sắp xếp theo byte
+
+Thứ tự byte của UTF-8 trùng thứ tự code point nên tìm nhị phân trên blob
+cho cùng kết quả với so sánh chuỗi. File chỉ đọc qua mmap, nhiều tiến trình
+dùng chung các trang bộ nhớ và không phải dựng set Python khi khởi động.
+"""
+
+import argparse, mmap, os, struct, sys
+
+MAGIC = b"VSYLIDX1"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<I")
+# Đọc cặp (đầu, cuối) của một âm tiết trong một lần unpack
+SPAN = struct.Struct("<II")
+
+def load_syllables(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+def build_index(words, path):
+    """Ghi chỉ mục cho tập words ra path, trả về số âm tiết"""
+    keys = sorted({w.encode("utf-8") for w in words})
+    offsets = [0]
+    for k in keys:
+        offsets.append(offsets[-1] + len(k))
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        for k in keys:
+            f.write(k)
+    return len(keys)
+
+class SyllableIndex:
+    """Tra cứu âm tiết trên file chỉ mục đã mmap, không nạp toàn bộ vào bộ nhớ"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            # Kiểm tra trước khi mmap: không mmap được file rỗng
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError(f"truncated syllable index: {path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"not a syllable index: {path}")
+        self._offsets = HEADER.size
+        self._blob = self._offsets + (self._count + 1) * OFFSET.size
+        # Bảng offset phải nằm trọn trong file trước khi đọc offset cuối
+        if (self._blob > len(self._mm)
+                or self._blob + self._offset(self._count) != len(self._mm)):
+            self._mm.close()
+            raise ValueError(f"truncated syllable index: {path}")
+
+    def _offset(self, i):
+        return OFFSET.unpack_from(self._mm, self._offsets + i * OFFSET.size)[0]
+
+    def _key(self, i):
+        start, end = SPAN.unpack_from(self._mm, self._offsets + i * OFFSET.size)
+        return self._mm[self._blob + start:self._blob + end]
+
+    def _bisect(self, key):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, word):
+        key = word.encode("utf-8")
+        i = self._bisect(key)
+        return i < self._count and self._key(i) == key
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._key(i).decode("utf-8")
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query a compact mmap syllable index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="compile a syllable list (one per line) into an index")
+    p_build.add_argument("input")
+    p_build.add_argument("output")
+    p_query = sub.add_parser("query", help="check words against an index")
+    p_query.add_argument("index")
+    p_query.add_argument("words", nargs="*", help="words to check (default: read stdin)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        n = build_index(load_syllables(args.input), args.output)
+        print(f"Indexed {n} syllables from {args.input} into {args.output}")
+        return
+
+    with SyllableIndex(args.index) as index:
+        words = args.words or (line.strip() for line in sys.stdin if line.strip())
+        for w in words:
+            print(f"{w}\t{'yes' if w in index else 'no'}")
+
+if __name__ == "__main__":
+    main()